@@ -0,0 +1,245 @@
+import json
+import random
+import threading
+import time
+
+DEFAULT_MODEL_NAME = "yolov8n_relu6_coco--640x640_quant_hailort_hailo8l_1"
+STANDIN_LABELS = ["person", "person", "person", "car", "car", "bicycle", "truck", "dog"]
+
+
+class InferenceBackend:
+    # What the pipeline needs from a model: predict(frame) and predict_batch(iterable of frames or
+    # (frame, info) tuples), both returning objects with .results (list of detection dicts) and .info
+    name = "base"
+
+    def load(self):
+        return self
+
+    def predict(self, frame, info=None):
+        raise NotImplementedError
+
+    def predict_batch(self, data):
+        for item in data:
+            frame, info = item if isinstance(item, tuple) else (item, None)
+            yield self.predict(frame, info)
+
+    def __call__(self, frame):
+        return self.predict(frame)
+
+    def describe(self):
+        return {'backend': self.name}
+
+
+class DegirumBackend(InferenceBackend):
+    # Hailo accelerator through DeGirum PySDK; predict_batch keeps several frames in flight on the device
+    name = "degirum"
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, inference_host_address="@local",
+                 zoo_url="degirum/hailo", device_type="HAILORT/HAILO8L", token=None):
+        self.model_name = model_name
+        self.inference_host_address = inference_host_address
+        self.zoo_url = zoo_url
+        self.device_type = device_type
+        self.token = token
+        self.model = None
+
+    def load(self):
+        import degirum as dg
+
+        kwargs = {}
+        if self.token is not None:
+            kwargs['token'] = self.token
+        self.model = dg.load_model(
+            model_name=self.model_name,
+            inference_host_address=self.inference_host_address,
+            zoo_url=self.zoo_url,
+            device_type=self.device_type,
+            **kwargs
+        )
+        self.model.image_backend = 'opencv'
+        self.model.overlay_show_prob = True
+        self.model.overlay_show_bbox = True
+        self.model.overlay_line_width = 2
+        return self
+
+    def predict(self, frame, info=None):
+        # Single-frame calls don't carry info through the SDK; use predict_batch for that
+        return self.model(frame)
+
+    def predict_batch(self, data):
+        return self.model.predict_batch(data)
+
+    def describe(self):
+        return {'backend': self.name, 'model': self.model_name, 'device_type': self.device_type}
+
+
+class StandInResult:
+    # Same shape as a DeGirum detection result: .results, .info and a readable str()
+    __slots__ = ('results', 'info')
+
+    def __init__(self, results, info=None):
+        self.results = results
+        self.info = info
+
+    def __str__(self):
+        return "\n".join(f"- {r['label']}: {r['score']:.2f} {r['bbox']}" for r in self.results) or "(no detections)"
+
+
+class StandInBackend(InferenceBackend):
+    # CPU stand-in for the Hailo model. Latency is drawn from a configurable distribution; detections
+    # are either simulated moving objects or replayed from a recorded JSON-lines file.
+    name = "standin"
+
+    def __init__(self, latency_ms=25.0, jitter_ms=5.0, distribution="normal", input_size=(640, 640),
+                 mean_objects=4, max_objects=30, replay_path=None, seed=None):
+        if distribution not in ("constant", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.distribution = distribution
+        self.input_size = input_size
+        self.mean_objects = mean_objects
+        self.max_objects = max_objects
+        self.replay_path = replay_path
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()  # the stand-in "device" runs one frame at a time
+        self._objects = []
+        self._replay = []
+        self._replay_index = 0
+
+    def load(self):
+        if self.replay_path:
+            self._replay = load_recorded_detections(self.replay_path)
+            if not self._replay:
+                raise ValueError(f"No detections found in {self.replay_path}")
+        return self
+
+    def _latency(self):
+        if self.distribution == "constant":
+            value = self.latency_ms
+        elif self.distribution == "normal":
+            value = self._rng.gauss(self.latency_ms, self.jitter_ms)
+        else:
+            # lognormal with the requested mean, jitter controlling the tail
+            sigma = max(self.jitter_ms, 1e-6) / max(self.latency_ms, 1e-6)
+            value = self.latency_ms * self._rng.lognormvariate(-sigma * sigma / 2, sigma)
+        return max(value, 0.0) / 1000.0
+
+    def _spawn(self):
+        width, height = self.input_size
+        w = self._rng.uniform(0.04, 0.25) * width
+        h = self._rng.uniform(0.08, 0.45) * height
+        return {
+            'label': self._rng.choice(STANDIN_LABELS),
+            'x': self._rng.uniform(0, width - w), 'y': self._rng.uniform(0, height - h),
+            'w': w, 'h': h,
+            'vx': self._rng.uniform(-6, 6), 'vy': self._rng.uniform(-3, 3),
+            'score': self._rng.uniform(0.4, 0.95),
+        }
+
+    def _simulate(self):
+        width, height = self.input_size
+        # Objects drift, bounce off the edges, and occasionally enter or leave the scene
+        if len(self._objects) < self.max_objects and self._rng.random() < self.mean_objects / 20.0:
+            self._objects.append(self._spawn())
+        if self._objects and self._rng.random() < 1 / 20.0:
+            self._objects.pop(self._rng.randrange(len(self._objects)))
+
+        results = []
+        for obj in self._objects:
+            obj['x'] += obj['vx']
+            obj['y'] += obj['vy']
+            if obj['x'] < 0 or obj['x'] + obj['w'] > width:
+                obj['vx'] = -obj['vx']
+                obj['x'] = min(max(obj['x'], 0), width - obj['w'])
+            if obj['y'] < 0 or obj['y'] + obj['h'] > height:
+                obj['vy'] = -obj['vy']
+                obj['y'] = min(max(obj['y'], 0), height - obj['h'])
+            score = min(max(obj['score'] + self._rng.gauss(0, 0.03), 0.05), 0.99)
+            results.append({
+                'bbox': [obj['x'], obj['y'], obj['x'] + obj['w'], obj['y'] + obj['h']],
+                'label': obj['label'],
+                'score': score,
+                'category_id': STANDIN_LABELS.index(obj['label']),
+            })
+        return results
+
+    def _next_replay(self):
+        results = self._replay[self._replay_index % len(self._replay)]
+        self._replay_index += 1
+        return [dict(r) for r in results]
+
+    def predict(self, frame, info=None):
+        with self._lock:
+            start = time.perf_counter()
+            results = self._next_replay() if self._replay else self._simulate()
+            remaining = self._latency() - (time.perf_counter() - start)
+            if remaining > 0:
+                time.sleep(remaining)
+        return StandInResult(results, info)
+
+    def describe(self):
+        return {'backend': self.name, 'latency_ms': self.latency_ms, 'jitter_ms': self.jitter_ms,
+                'distribution': self.distribution, 'replay': self.replay_path}
+
+
+class RecordingBackend(InferenceBackend):
+    # Wraps another backend and appends every result to a JSON-lines file the stand-in can replay
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.path = path
+        self.name = f"{inner.name}+record"
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        self.inner.load()
+        self._file = open(self.path, "a", buffering=1)
+        return self
+
+    def _record(self, result):
+        line = json.dumps({'detections': [
+            {'bbox': [float(v) for v in r['bbox']], 'label': r['label'], 'score': float(r['score'])}
+            for r in result.results
+        ]})
+        with self._lock:
+            self._file.write(line + "\n")
+        return result
+
+    def predict(self, frame, info=None):
+        return self._record(self.inner.predict(frame, info))
+
+    def predict_batch(self, data):
+        for result in self.inner.predict_batch(data):
+            yield self._record(result)
+
+    def describe(self):
+        return dict(self.inner.describe(), record=self.path)
+
+
+def load_recorded_detections(path):
+    # JSON lines; each line is a detection list or an object with "detections" / "results"
+    frames = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict):
+                record = record.get('detections', record.get('results', []))
+            frames.append(record)
+    return frames
+
+
+def make_backend(kind="degirum", record_path=None, **options):
+    # kind: "degirum" (alias "hailo") or "standin"; options go to the backend constructor
+    if kind in ("degirum", "hailo"):
+        backend = DegirumBackend(**options)
+    elif kind == "standin":
+        backend = StandInBackend(**options)
+    else:
+        raise ValueError(f"Unknown inference backend: {kind}")
+    if record_path:
+        backend = RecordingBackend(backend, record_path)
+    return backend.load()
@@ -0,0 +1,101 @@
+import argparse
+import json
+import statistics
+import time
+
+import cv2
+import numpy as np
+
+from encoders import OpenCVJpegEncoder, TurboJpegEncoder, turbojpeg_available
+
+
+def load_sample_frame(path=None, size=(1280, 720)):
+    # A still image, the first frame of a video, or a synthetic frame with edges, gradients and noise
+    if path:
+        frame = cv2.imread(path)
+        if frame is None:
+            cap = cv2.VideoCapture(path)
+            ret, frame = cap.read()
+            cap.release()
+            if not ret:
+                raise SystemExit(f"Could not read a frame from {path}")
+        return cv2.resize(frame, size)
+
+    width, height = size
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[:] = gradient[None, :, None].astype(np.uint8)
+    frame = cv2.add(frame, rng.integers(0, 24, frame.shape, dtype=np.uint8))
+    for i in range(12):
+        x, y = int(rng.integers(0, width - 200)), int(rng.integers(0, height - 150))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(frame, (x, y), (x + 200, y + 150), color, -1)
+        cv2.putText(frame, f"obj {i}", (x + 10, y + 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+    return frame
+
+
+def candidate_encoders(quality, subsampling, optimize):
+    encoders = [
+        OpenCVJpegEncoder(quality, progressive=False, optimize=optimize, subsampling=subsampling),
+        OpenCVJpegEncoder(quality, progressive=True, optimize=optimize, subsampling=subsampling),
+    ]
+    if turbojpeg_available():
+        encoders.append(TurboJpegEncoder(quality, progressive=False, subsampling=subsampling))
+        encoders.append(TurboJpegEncoder(quality, progressive=True, subsampling=subsampling))
+    return encoders
+
+
+def benchmark(encoder, frame, iterations, warmup=5):
+    for _ in range(warmup):
+        encoder.encode(frame)
+
+    timings = []
+    size = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        jpeg = encoder.encode(frame)
+        timings.append((time.perf_counter() - start) * 1000)
+        size = len(jpeg) if jpeg else 0
+
+    timings.sort()
+    return dict(encoder.describe(), **{
+        'progressive': getattr(encoder, 'progressive', False),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'p50_ms': round(timings[len(timings) // 2], 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'bytes_per_frame': size,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JPEG encoder micro-benchmark for the MJPEG stream")
+    parser.add_argument("--input", help="image or video to take the sample frame from (default: synthetic frame)")
+    parser.add_argument("--size", default="1280x720", help="frame size WxH")
+    parser.add_argument("--quality", type=int, default=75)
+    parser.add_argument("--subsampling", choices=("420", "422", "444"), default="420")
+    parser.add_argument("--optimize", action="store_true", help="build optimized Huffman tables")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+    frame = load_sample_frame(args.input, size)
+    results = [benchmark(e, frame, args.iterations) for e in candidate_encoders(args.quality, args.subsampling, args.optimize)]
+
+    if args.json:
+        print(json.dumps({'frame': list(size), 'iterations': args.iterations, 'results': results}, indent=2))
+        return
+
+    if not turbojpeg_available():
+        print("TurboJPEG not available; install PyTurboJPEG and libjpeg-turbo to include it")
+    print(f"Frame {size[0]}x{size[1]}, quality {args.quality}, subsampling {args.subsampling}, "
+          f"optimize {args.optimize}, {args.iterations} iterations")
+    print(f"{'backend':<20}{'progressive':>12}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'bytes':>10}")
+    for r in results:
+        print(f"{r['backend']:<20}{str(r['progressive']):>12}{r['mean_ms']:>10.2f}{r['p50_ms']:>10.2f}"
+              f"{r['p95_ms']:>10.2f}{r['bytes_per_frame']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import argparse
+import http.client
+import http.cookiejar
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+DEFAULT_USERNAME = "Deepan"
+DEFAULT_PASSWORD = "erlspectra"
+BOUNDARY = b"--frame\r\n"
+
+
+def login(base_url, username, password):
+    # Returns the Cookie header value for a logged-in session
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    data = urllib.parse.urlencode({'username': username, 'password': password}).encode()
+    reply = json.loads(opener.open(f"{base_url}/login", data=data, timeout=10).read())
+    if not reply.get('success'):
+        raise SystemExit(f"Login failed: {reply.get('message')}")
+    return "; ".join(f"{c.name}={c.value}" for c in jar)
+
+
+def scrape_metrics(base_url):
+    # Unlabelled samples and per-label totals from the server's /metrics page
+    text = urllib.request.urlopen(f"{base_url}/metrics", timeout=5).read().decode()
+    values = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = re.match(r"([a-zA-Z_:][\w:]*)(\{[^}]*\})?\s+(\S+)", line)
+        if match and match.group(3) != "NaN":
+            name = match.group(1)
+            values[name] = values.get(name, 0.0) + float(match.group(3))
+    return values
+
+
+class Viewer(threading.Thread):
+    # One /video_feed session; counts multipart frames and bytes as they arrive
+    def __init__(self, host, port, path, cookie, stop_event):
+        super().__init__(daemon=True)
+        self.host, self.port, self.path, self.cookie = host, port, path, cookie
+        self.stop_event = stop_event
+        self.frames = 0
+        self.bytes = 0
+        self.error = None
+        self._conn = None
+
+    def run(self):
+        try:
+            self._conn = http.client.HTTPConnection(self.host, self.port, timeout=10)
+            self._conn.request("GET", self.path, headers={'Cookie': self.cookie})
+            response = self._conn.getresponse()
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            tail = b""
+            while not self.stop_event.is_set():
+                chunk = response.read1(65536)
+                if not chunk:
+                    break
+                self.bytes += len(chunk)
+                data = tail + chunk
+                self.frames += data.count(BOUNDARY)
+                tail = data[-(len(BOUNDARY) - 1):]
+        except Exception as e:
+            if not self.stop_event.is_set():
+                self.error = str(e)
+        finally:
+            self.close()
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+
+    def snapshot(self):
+        return self.frames, self.bytes
+
+
+class DetectionsPoller(threading.Thread):
+    # One dashboard-style client polling /detections on a keep-alive connection
+    def __init__(self, host, port, path, cookie, stop_event, interval):
+        super().__init__(daemon=True)
+        self.host, self.port, self.path, self.cookie = host, port, path, cookie
+        self.stop_event = stop_event
+        self.interval = interval
+        self.requests = 0
+        self.failures = 0
+        self.latency = 0.0
+
+    def run(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=10)
+        while not self.stop_event.is_set():
+            start = time.monotonic()
+            try:
+                conn.request("GET", self.path, headers={'Cookie': self.cookie})
+                response = conn.getresponse()
+                response.read()
+                if response.status == 200:
+                    self.requests += 1
+                    self.latency += time.monotonic() - start
+                else:
+                    self.failures += 1
+            except Exception:
+                self.failures += 1
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=10)
+            self.stop_event.wait(max(0.0, self.interval - (time.monotonic() - start)))
+        conn.close()
+
+    def snapshot(self):
+        return self.requests, self.failures, self.latency
+
+
+def run_step(base_url, cookie, clients, args):
+    parsed = urllib.parse.urlparse(base_url)
+    host, port = parsed.hostname, parsed.port or 80
+    stop_event = threading.Event()
+    query = urllib.parse.urlencode({'fps': args.fps, 'profile': args.profile})
+    viewers = [Viewer(host, port, f"/video_feed/{args.camera}?{query}", cookie, stop_event) for _ in range(clients)]
+    pollers = [DetectionsPoller(host, port, f"/detections/{args.camera}", cookie, stop_event, 1.0 / args.poll_hz)
+               for _ in range(clients if args.poll_hz > 0 else 0)]
+    for t in viewers + pollers:
+        t.start()
+
+    time.sleep(args.warmup)
+    frames_start = [v.snapshot() for v in viewers]
+    polls_start = [p.snapshot() for p in pollers]
+    metrics_start = scrape_metrics(base_url)
+    start = time.monotonic()
+    time.sleep(args.duration)
+    elapsed = time.monotonic() - start
+    frames_end = [v.snapshot() for v in viewers]
+    polls_end = [p.snapshot() for p in pollers]
+    metrics_end = scrape_metrics(base_url)
+
+    stop_event.set()
+    for v in viewers:
+        v.close()
+    for t in viewers + pollers:
+        t.join(timeout=2)
+
+    # /metrics is re-rendered every few seconds, so server rates use the server's own clock between the two pages
+    server_elapsed = metrics_end.get('spectra_uptime_seconds', 0) - metrics_start.get('spectra_uptime_seconds', 0)
+
+    def rate(name):
+        if server_elapsed <= 0:
+            return 0.0
+        return (metrics_end.get(name, 0) - metrics_start.get(name, 0)) / server_elapsed
+
+    client_fps = [(end[0] - begin[0]) / elapsed for begin, end in zip(frames_start, frames_end)]
+    total_bytes = sum(end[1] - begin[1] for begin, end in zip(frames_start, frames_end))
+    polls = sum(end[0] - begin[0] for begin, end in zip(polls_start, polls_end))
+    poll_failures = sum(end[1] - begin[1] for begin, end in zip(polls_start, polls_end))
+    poll_latency = sum(end[2] - begin[2] for begin, end in zip(polls_start, polls_end))
+    return {
+        'clients': clients,
+        'client_fps_mean': round(sum(client_fps) / len(client_fps), 2) if client_fps else 0,
+        'client_fps_min': round(min(client_fps), 2) if client_fps else 0,
+        'client_fps_max': round(max(client_fps), 2) if client_fps else 0,
+        'bytes_per_s': round(total_bytes / elapsed),
+        'detections_req_per_s': round(polls / elapsed, 2),
+        'detections_failures': poll_failures,
+        'detections_latency_ms': round(poll_latency / polls * 1000, 1) if polls else 0,
+        'server_inference_fps': round(rate('spectra_pipeline_completed_total'), 2),
+        'server_capture_fps': round(rate('spectra_frames_captured_total'), 2),
+        'server_cpu_percent': round(rate('spectra_process_cpu_seconds_total') * 100, 1),
+        'server_rss_bytes': int(metrics_end.get('spectra_process_resident_memory_bytes', 0)),
+        'slow_disconnects': int(metrics_end.get('spectra_mjpeg_clients_disconnected_slow_total', 0)
+                                - metrics_start.get('spectra_mjpeg_clients_disconnected_slow_total', 0)),
+        'viewer_errors': [v.error for v in viewers if v.error],
+    }
+
+
+def find_saturation(steps, target_fps, tolerance):
+    # First step where viewers fall short of their target fps, or inference drops below the single-client baseline
+    if not steps:
+        return None
+    baseline = steps[0]['server_inference_fps']
+    for step in steps:
+        if step['client_fps_mean'] < target_fps * (1 - tolerance):
+            return {'clients': step['clients'], 'reason': "viewer fps below target"}
+        if baseline and step['server_inference_fps'] < baseline * (1 - tolerance):
+            return {'clients': step['clients'], 'reason': "inference fps below baseline"}
+    return None
+
+
+def start_server(args):
+    # The live server on the stand-in backend and a synthetic camera, so the whole test stays on localhost
+    env = dict(os.environ,
+               CAMERA_SOURCES=f"{args.camera}={args.source}",
+               INFERENCE_BACKEND="standin")
+    server = subprocess.Popen([sys.executable, "video_stream_server.py"], env=env,
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.DEVNULL if not args.server_log else None,
+                              stderr=subprocess.STDOUT if not args.server_log else None)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("Server exited during startup (run with --server-log to see why)")
+        try:
+            if scrape_metrics(args.url).get('spectra_frames_published_total', 0) > 0:
+                return server
+        except OSError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise SystemExit("Server did not start publishing frames within 30s")
+
+
+def print_curve(steps, saturation, target_fps):
+    width = 40
+    peak_fps = max([s['server_inference_fps'] for s in steps] + [1])
+    print(f"{'clients':>8}{'fps/client':>12}{'min':>8}{'MB/s':>8}{'det req/s':>11}{'infer fps':>11}{'cpu %':>8}  "
+          f"viewer fps vs target {target_fps}")
+    for s in steps:
+        bar = "#" * int(round(width * min(s['client_fps_mean'] / target_fps, 1.0))) if target_fps else ""
+        marker = "  <- saturated" if saturation and saturation['clients'] == s['clients'] else ""
+        print(f"{s['clients']:>8}{s['client_fps_mean']:>12.2f}{s['client_fps_min']:>8.2f}"
+              f"{s['bytes_per_s'] / 1e6:>8.2f}{s['detections_req_per_s']:>11.2f}{s['server_inference_fps']:>11.2f}"
+              f"{s['server_cpu_percent']:>8.1f}  {bar:<{width}}{marker}")
+    print(f"peak inference {peak_fps:.1f} fps")
+    if saturation:
+        print(f"Saturates at {saturation['clients']} clients: {saturation['reason']}")
+    else:
+        print("No saturation within the tested range")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test MJPEG fan-out: ramp concurrent viewers and find where fps drops")
+    parser.add_argument("--clients", default="1,2,4,8,16,32", help="concurrent viewers per step")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="measured seconds per step (keep above the server's 5s stats interval)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds per step before measuring")
+    parser.add_argument("--fps", type=float, default=15, help="fps each viewer asks for (?fps=)")
+    parser.add_argument("--profile", default="full", help="stream profile each viewer asks for")
+    parser.add_argument("--poll-hz", type=float, default=2.0, help="/detections polls per second per client (0 = none)")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="fractional shortfall that counts as saturated")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="server to test")
+    parser.add_argument("--camera", default="cam0")
+    parser.add_argument("--source", default="synthetic:1280x720@15", help="source for the spawned server's camera")
+    parser.add_argument("--no-spawn", action="store_true", help="test an already running server at --url")
+    parser.add_argument("--server-log", action="store_true", help="show the spawned server's output")
+    parser.add_argument("--username", default=DEFAULT_USERNAME)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    if urllib.parse.urlparse(args.url).hostname not in ("127.0.0.1", "localhost", "::1"):
+        raise SystemExit("The load test only runs against a local server")
+
+    server = None if args.no_spawn else start_server(args)
+    try:
+        cookie = login(args.url, args.username, args.password)
+        steps = []
+        for clients in (int(c) for c in args.clients.split(",")):
+            step = run_step(args.url, cookie, clients, args)
+            steps.append(step)
+            if not args.json:
+                print(f"{clients} clients: {step['client_fps_mean']} fps/client, "
+                      f"inference {step['server_inference_fps']} fps", file=sys.stderr)
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    saturation = find_saturation(steps, args.fps, args.tolerance)
+    results = {'url': args.url, 'fps': args.fps, 'profile': args.profile, 'poll_hz': args.poll_hz,
+               'duration_s': args.duration, 'steps': steps, 'saturation': saturation}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_curve(steps, saturation, args.fps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+from backends import make_backend
+from capture import CaptureThread, FileSource, LatestFrameBuffer, SyntheticSource
+from metrics import process_stats, stage_metrics
+from overlay import render_detections
+from pipeline import BLOCK, DROP_NEWEST, DROP_OLDEST, RoundRobinScheduler, VideoPipeline
+from streaming import DEFAULT_PROFILES, JpegBroadcaster
+from tiling import TileLayout
+from udp_sender import UdpSender
+from wire_format import WireEncoder
+
+SOURCE_ID = "bench"
+
+
+def open_input(spec, realtime, frames):
+    # A video file, or "synthetic[:WxH]" for the built-in generator (handy where no clip is available)
+    if spec.startswith("synthetic"):
+        width, height = 1280, 720
+        if ":" in spec:
+            width, height = (int(v) for v in spec.split(":", 1)[1].lower().split("x"))
+        return SyntheticSource(width, height, fps=30 if realtime else 0, num_frames=frames or 300)
+    if not os.path.isfile(spec):
+        raise SystemExit(f"Input not found: {spec}")
+    return FileSource(spec, loop=False, realtime=realtime)
+
+
+def build_backend(args):
+    if args.backend == "standin":
+        return make_backend("standin", record_path=args.record, latency_ms=args.latency_ms,
+                            jitter_ms=args.jitter_ms, distribution=args.distribution, seed=0)
+    options = {}
+    if args.model:
+        options['model_name'] = args.model
+    if args.device_type:
+        options['device_type'] = args.device_type
+    return make_backend(args.backend, record_path=args.record, **options)
+
+
+def outstanding(buffer, pipeline):
+    # Frames captured and not overwritten that have neither completed nor been dropped by a stage queue
+    queue_drops = sum(q.dropped for q in (pipeline.preprocess_queue, pipeline.infer_queue, pipeline.postprocess_queue))
+    return buffer.frames_in - buffer.frames_dropped - pipeline.postprocessor.processed - queue_drops
+
+
+def run(args):
+    stop_event = threading.Event()
+    source = open_input(args.input, args.realtime, args.frames)
+    if not source.isOpened():
+        raise SystemExit(f"Could not open {args.input}")
+
+    # As-fast-as-possible runs process every frame; real-time runs drop like the live server does
+    buffer = LatestFrameBuffer(lossless=not args.realtime)
+    capture = CaptureThread(source, buffer, stop_event, name="capture-bench", source_id=SOURCE_ID)
+
+    profiles = {name: DEFAULT_PROFILES[name] for name in args.profiles.split(",")}
+    jpeg = JpegBroadcaster(name=SOURCE_ID, profiles=profiles, encoder=args.encoder)
+
+    encode = WireEncoder([SOURCE_ID]).encode if args.udp_format == "binary" else None
+    udp_sender = UdpSender("127.0.0.1", args.udp_port, stop_event, broadcast=False, encode=encode)
+
+    display_size = tuple(int(v) for v in args.display_size.lower().split("x"))
+
+    def postprocess(job):
+        # Same work as the server's postprocess stage, minus the web-side bookkeeping
+        packet = job.packet
+        start = time.perf_counter()
+        display_frame, detections = render_detections(packet.frame, job.result.results, packet.wall_ts, job.letterbox,
+                                                     display_size)
+        stage_metrics.record("overlay", time.perf_counter() - start)
+        jpeg.publish(display_frame, packet.seq, packet.capture_ts)
+        udp_sender.submit({
+            'camera': SOURCE_ID, 'frame_seq': packet.seq, 'detections': detections, 'timestamp': packet.wall_ts
+        }, capture_ts=packet.capture_ts)
+        stage_metrics.record("total", time.monotonic() - packet.capture_ts)
+        stage_metrics.frames_out.mark()
+        return job
+
+    model = build_backend(args)
+    drop_policy = args.drop_policy or (DROP_OLDEST if args.realtime else BLOCK)
+    tile_layouts = {}
+    if args.tile_overlap is not None or args.tile_grid:
+        grid = tuple(int(v) for v in args.tile_grid.lower().split("x")) if args.tile_grid else None
+        tile_layouts[SOURCE_ID] = TileLayout(overlap=args.tile_overlap or 0.2, grid=grid,
+                                             global_view=not args.no_global_view)
+    pipeline = VideoPipeline(RoundRobinScheduler([(SOURCE_ID, buffer)]), model, postprocess, stop_event,
+                             queue_depth=args.queue_depth, drop_policy=drop_policy, tile_layouts=tile_layouts)
+
+    cpu_start = process_stats()['cpu_seconds']
+    start = time.monotonic()
+    udp_sender.start()
+    # Keep every rendition subscribed for the whole run, as if a viewer were watching each one
+    subscriptions = [jpeg.subscribe(profile) for profile in profiles]
+    for subscription in subscriptions:
+        subscription.__enter__()
+    jpeg.start(stop_event)
+    pipeline.start()
+    capture.start()
+
+    # Run until the input ends (or --frames / --duration), then let frames already in flight finish
+    deadline = start + args.duration if args.duration else None
+    while capture.is_alive() and pipeline.is_alive():
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        if args.frames and stage_metrics.frames_out.count >= args.frames:
+            break
+        time.sleep(0.05)
+    drain_deadline = time.monotonic() + args.drain_timeout
+    while time.monotonic() < drain_deadline and pipeline.is_alive() and outstanding(buffer, pipeline) > 0:
+        if args.frames and stage_metrics.frames_out.count >= args.frames:
+            break
+        time.sleep(0.02)
+    captured = buffer.frames_in
+    elapsed = time.monotonic() - start
+    cpu_seconds = process_stats()['cpu_seconds'] - cpu_start
+
+    stop_event.set()
+    buffer.close()
+    pipeline.stop()
+    udp_sender.stop()
+    for subscription in subscriptions:
+        subscription.__exit__(None, None, None)
+    pipeline.join(timeout=1)
+    capture.join(timeout=1)
+    udp_sender.join(timeout=1)
+
+    completed = pipeline.postprocessor.processed
+    pipeline_stats = pipeline.stats()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak_rss *= 1024  # kilobytes everywhere but macOS
+    return {
+        'input': args.input,
+        'mode': "realtime" if args.realtime else "max",
+        'backend': model.describe(),
+        'drop_policy': drop_policy,
+        'queue_depth': args.queue_depth,
+        'encoder': args.encoder,
+        'profiles': list(profiles),
+        'udp_format': args.udp_format,
+        'tiling': pipeline_stats['tiling'].get(SOURCE_ID),
+        'tiles_submitted': pipeline_stats['tiles_submitted'],
+        'elapsed_s': round(elapsed, 3),
+        'frames_captured': captured,
+        'frames_completed': completed,
+        'frames_dropped': {
+            'capture': buffer.frames_dropped,
+            **{name: q['dropped'] for name, q in pipeline_stats['queues'].items()},
+            'udp': udp_sender.dropped,
+        },
+        'input_fps': round(captured / elapsed, 2) if elapsed > 0 else 0,
+        'output_fps': round(completed / elapsed, 2) if elapsed > 0 else 0,
+        'jpeg': jpeg.stats(),
+        'stages': {stage: dict(h.summary(), max_ms=round(h.max_ms, 2))
+                   for stage, h in stage_metrics.histograms.items() if h.max_ms > 0},
+        'cpu_seconds': round(cpu_seconds, 2),
+        'cpu_percent': round(cpu_seconds / elapsed * 100, 1) if elapsed > 0 else 0,
+        'peak_rss_bytes': peak_rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the detection pipeline over a recorded video and report throughput")
+    parser.add_argument("--input", default="assets/Traffic.mp4", help="video file, or synthetic[:WxH]")
+    parser.add_argument("--realtime", action="store_true",
+                        help="pace reads to the file's fps (default: as fast as the pipeline allows, no drops)")
+    parser.add_argument("--frames", type=int, default=0, help="stop after this many frames (0 = whole input)")
+    parser.add_argument("--duration", type=float, default=0, help="stop after this many seconds (0 = no limit)")
+    parser.add_argument("--drain-timeout", type=float, default=10.0, help="seconds to wait for in-flight frames")
+    parser.add_argument("--backend", choices=("standin", "hailo", "degirum"), default="standin")
+    parser.add_argument("--model", help="model name for the Hailo backend")
+    parser.add_argument("--device-type", help="device type for the Hailo backend, e.g. HAILORT/HAILO8")
+    parser.add_argument("--latency-ms", type=float, default=25.0, help="stand-in inference latency")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="stand-in latency jitter")
+    parser.add_argument("--distribution", choices=("constant", "normal", "lognormal"), default="normal")
+    parser.add_argument("--record", help="append every inference result to this JSON-lines file (STANDIN_REPLAY input)")
+    parser.add_argument("--queue-depth", type=int, default=2)
+    parser.add_argument("--drop-policy", choices=(DROP_OLDEST, DROP_NEWEST, BLOCK),
+                        help="stage queue policy (default: drop_oldest realtime, block otherwise)")
+    parser.add_argument("--tile-overlap", type=float,
+                        help="infer overlapping native-resolution tiles with this overlap fraction (e.g. 0.2)")
+    parser.add_argument("--tile-grid", help="fixed tile grid COLSxROWS instead of deriving it from the overlap")
+    parser.add_argument("--no-global-view", action="store_true", help="tiles only, no downscaled whole-frame view")
+    parser.add_argument("--display-size", default="1280x720", help="overlay/stream frame size WxH")
+    parser.add_argument("--profiles", default="full", help=f"renditions to encode, from {','.join(DEFAULT_PROFILES)}")
+    parser.add_argument("--encoder", default="opencv-baseline")
+    parser.add_argument("--udp-format", choices=("json", "binary"), default="json")
+    parser.add_argument("--udp-port", type=int, default=5005, help="UDP port on 127.0.0.1 to send detections to")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--json", action="store_true", help="print the JSON report instead of a summary")
+    args = parser.parse_args()
+
+    report = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['input']} ({report['mode']}, {report['backend']['backend']}): "
+          f"{report['frames_completed']}/{report['frames_captured']} frames in {report['elapsed_s']}s, "
+          f"{report['output_fps']} fps out, {report['input_fps']} fps in")
+    if report['tiling']:
+        tiling = report['tiling']
+        print(f"Tiled: {tiling['tiles']} tiles{' + global view' if tiling['global_view'] else ''} per "
+              f"{tiling['frame_size'][0]}x{tiling['frame_size'][1]} frame, {report['tiles_submitted']} model calls")
+    print(f"CPU {report['cpu_seconds']}s ({report['cpu_percent']}%), peak RSS {report['peak_rss_bytes'] / 1e6:.1f} MB, "
+          f"dropped {report['frames_dropped']}")
+    print(f"{'stage':<22}{'count':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage, s in report['stages'].items():
+        print(f"{stage:<22}{s['count']:>8}{s['mean_ms']:>10.2f}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}"
+              f"{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
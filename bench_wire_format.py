@@ -0,0 +1,93 @@
+import argparse
+import json
+import random
+import time
+
+from udp_sender import UdpSender
+from wire_format import WireDecoder, WireEncoder
+
+LABELS = ["person", "car", "bicycle", "truck", "bus", "dog", "motorcycle"]
+
+
+def synthetic_detections(count, rng):
+    detections = []
+    for _ in range(count):
+        x1, y1 = rng.uniform(0, 1200), rng.uniform(0, 650)
+        detections.append({
+            "label": rng.choice(LABELS),
+            "score": rng.uniform(0.3, 0.99),
+            "bbox": [int(x1), int(y1), int(x1 + rng.uniform(10, 200)), int(y1 + rng.uniform(20, 300))],
+            "timestamp": time.time()
+        })
+    return detections
+
+
+def sample_stats():
+    # Roughly what performance_stats holds on a running server
+    return {
+        'fps': 14.8, 'frame_count': 1234, 'uptime': 3600.0, 'detection_count': 12,
+        'inference_time': 18.4, 'processing_time': 42.1,
+        'udp': {'submitted': 1000, 'sent': 998, 'dropped': 2, 'errors': 0, 'queue_depth': 0},
+    }
+
+
+def measure(encode, message, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        datagrams = encode(dict(message))
+    elapsed = (time.perf_counter() - start) / iterations
+    return datagrams, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the JSON and binary UDP detection payloads")
+    parser.add_argument("--counts", default="0,5,20,50,100,200", help="detections per frame to test")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--mtu", type=int, default=1400, help="max datagram size for the binary format")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    rows = []
+    for count in (int(c) for c in args.counts.split(",")):
+        message = {
+            'camera': 'cam0', 'frame_seq': 42, 'seq': 7, 'timestamp': time.time(),
+            'detections': synthetic_detections(count, rng), 'stats': sample_stats()
+        }
+        json_datagrams, json_time = measure(UdpSender._encode_json, message, args.iterations)
+
+        encoder = WireEncoder(['cam0'], stats_interval=float('inf'), max_datagram=args.mtu)
+        encoder.encode(dict(message))  # first message carries metadata; steady state doesn't
+        binary_datagrams, binary_time = measure(encoder.encode, message, args.iterations)
+
+        # Round-trip check through the reference decoder
+        decoder = WireDecoder()
+        decoder.labels, decoder.cameras = encoder.labels, encoder.cameras
+        decoded = None
+        for datagram in binary_datagrams:
+            decoded = decoder.feed(datagram) or decoded
+        assert decoded is not None and len(decoded['detections']) == count
+
+        rows.append({
+            'detections': count,
+            'json_bytes': sum(len(d) for d in json_datagrams),
+            'json_encode_us': round(json_time * 1e6, 1),
+            'binary_bytes': sum(len(d) for d in binary_datagrams),
+            'binary_datagrams': len(binary_datagrams),
+            'binary_encode_us': round(binary_time * 1e6, 1),
+        })
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'dets':>6}{'json B':>10}{'json us':>10}{'binary B':>10}{'chunks':>8}{'binary us':>11}{'ratio':>8}")
+    for r in rows:
+        ratio = r['json_bytes'] / r['binary_bytes'] if r['binary_bytes'] else 0
+        print(f"{r['detections']:>6}{r['json_bytes']:>10}{r['json_encode_us']:>10}{r['binary_bytes']:>10}"
+              f"{r['binary_datagrams']:>8}{r['binary_encode_us']:>11}{ratio:>8.1f}x")
+    print("JSON sends stats with every frame; binary sends them every stats interval")
+
+
+if __name__ == "__main__":
+    main()
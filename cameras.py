@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+
+import cv2
+
+from capture import CaptureThread, LatestFrameBuffer, StallWatchdog, open_source
+from streaming import EventBroadcaster, JpegBroadcaster
+
+
+class Camera:
+    # One input: its own capture thread and frame buffer, plus the latest published results for the web side
+    def __init__(self, cam_id, source_url, display_size=(1280, 720), source_fps=15, stream_profiles=None,
+                 jpeg_encoder="opencv-baseline", change_filter=None, tracker=None,
+                 open_timeout_ms=10000, read_timeout_ms=5000):
+        self.cam_id = cam_id
+        self.source_url = source_url
+        self.open_timeout_ms = open_timeout_ms
+        self.read_timeout_ms = read_timeout_ms
+        self.display_size = display_size
+        self.source_fps = source_fps
+        self.buffer = LatestFrameBuffer()
+        self.capture = None
+        # Capture stats reported by the inference process when it runs separately (PROCESS_MODE=split)
+        self.remote_capture = None
+        self.lock = threading.Lock()
+        self.latest_frame = None
+        self.latest_detections = []
+        self.stats = {}
+        self.frames_published = 0
+        self.jpeg = JpegBroadcaster(name=cam_id, profiles=stream_profiles, encoder=jpeg_encoder)
+        self.events = EventBroadcaster()
+        # Optional ChangeFilter factory: detections are then only published when the scene changes
+        self.change_filter = change_filter() if change_filter else None
+        # Optional Tracker factory: detections get stable track ids, and frames that skip the model get predicted boxes
+        self.tracker = tracker() if tracker else None
+
+    def _open(self):
+        cap = open_source(self.source_url, self.open_timeout_ms, self.read_timeout_ms)
+        cap.set(cv2.CAP_PROP_FPS, self.source_fps)
+        return cap
+
+    def start(self, stop_event, reconnect=None):
+        # With a reconnect policy the camera is retried in the background, so a source that is
+        # down at startup (or drops later) never takes the model or the web server with it
+        if reconnect is None:
+            cap = self._open()
+            if not cap.isOpened():
+                cap.release()
+                raise Exception(f"Could not open video: {self.source_url}")
+            source = cap
+        else:
+            source = self._open
+        self.capture = CaptureThread(source, self.buffer, stop_event, name=f"capture-{self.cam_id}",
+                                     source_id=self.cam_id, reconnect=reconnect)
+        self.capture.start()
+        self.jpeg.start(stop_event)
+
+    def publish(self, frame, detections, stats=None, seq=None, timestamp=None, keyframe=False, capture_ts=None,
+                is_valid=None):
+        # detections=None updates the picture only and keeps the last published detection set
+        with self.lock:
+            self.latest_frame = frame
+            if detections is not None:
+                self.latest_detections = detections
+            self.frames_published += 1
+            if stats:
+                self.stats.update(stats)
+        self.jpeg.publish(frame, seq, capture_ts, is_valid)
+        if detections is not None:
+            self.events.publish('detections', {
+                'camera': self.cam_id,
+                'seq': seq,
+                'timestamp': timestamp,
+                'keyframe': keyframe,
+                'detections': detections
+            }, event_id=seq)
+
+    def capture_stats(self):
+        if self.capture is not None:
+            return self.capture.stats()
+        return self.remote_capture or {'state': 'not started'}
+
+    def snapshot(self):
+        with self.lock:
+            return self.latest_frame, self.latest_detections, dict(self.stats)
+
+    @property
+    def failed(self):
+        return self.capture is not None and self.capture.failed.is_set()
+
+
+class CameraRegistry:
+    def __init__(self):
+        self._cameras = {}
+        self.watchdog = None
+
+    def add(self, cam_id, source_url, **kwargs):
+        if cam_id in self._cameras:
+            raise ValueError(f"Duplicate camera id: {cam_id}")
+        camera = Camera(cam_id, source_url, **kwargs)
+        self._cameras[cam_id] = camera
+        return camera
+
+    def get(self, cam_id):
+        return self._cameras.get(cam_id)
+
+    def ids(self):
+        return list(self._cameras)
+
+    def default(self):
+        return next(iter(self._cameras.values()), None)
+
+    def __iter__(self):
+        return iter(list(self._cameras.values()))
+
+    def __len__(self):
+        return len(self._cameras)
+
+    def buffers(self):
+        return [(camera.cam_id, camera.buffer) for camera in self]
+
+    def start_all(self, stop_event, reconnect=None, stall_timeout=None):
+        started = 0
+        for camera in self:
+            try:
+                camera.start(stop_event, reconnect)
+                started += 1
+            except Exception as e:
+                print(f"Error starting camera {camera.cam_id}: {e}")
+
+        if stall_timeout:
+            self.watchdog = StallWatchdog([c.capture for c in self if c.capture is not None], stall_timeout, stop_event)
+            self.watchdog.start()
+        return started
+
+    def all_failed(self):
+        return all(camera.capture is None or camera.failed for camera in self)
+
+
+def load_camera_sources(spec, default_source):
+    # spec is either a JSON file ({"cam0": "rtsp://...", ...}) or "cam0=rtsp://...,cam1=..."; empty means one camera
+    if not spec:
+        return {"cam0": default_source}
+    if os.path.isfile(spec):
+        with open(spec) as f:
+            return json.load(f)
+
+    sources = {}
+    for index, entry in enumerate(part.strip() for part in spec.split(",")):
+        if not entry:
+            continue
+        cam_id, sep, url = entry.partition("=")
+        if not sep or "://" in cam_id:
+            cam_id, url = f"cam{index}", entry
+        sources[cam_id.strip()] = url.strip()
+    return sources
+
+
+def build_registry(sources, **kwargs):
+    registry = CameraRegistry()
+    for cam_id, url in sources.items():
+        registry.add(cam_id, url, **kwargs)
+    return registry
@@ -0,0 +1,420 @@
+import random
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from metrics import stage_metrics
+from tracing import tracer
+
+
+class FramePacket:
+    __slots__ = ('seq', 'frame', 'capture_ts', 'wall_ts', 'source_id')
+
+    def __init__(self, seq, frame, capture_ts, wall_ts, source_id=None):
+        self.seq = seq
+        self.frame = frame
+        self.capture_ts = capture_ts  # time.monotonic() when the frame left the source
+        self.wall_ts = wall_ts        # time.time() for display / UDP consumers
+        self.source_id = source_id
+
+
+class LatestFrameBuffer:
+    # Single-slot buffer: the writer always overwrites, readers only ever see the newest frame.
+    # An optional listener condition is notified on every put so one thread can wait on many buffers.
+    # With lossless=True put() instead waits for the previous frame to be taken (offline benchmarks).
+    def __init__(self, listener=None, lossless=False):
+        self._cond = threading.Condition()
+        self.listener = listener
+        self.lossless = lossless
+        self._packet = None
+        self._consumed_seq = -1
+        self._closed = False
+        self.frames_in = 0
+        self.frames_dropped = 0
+
+    def put(self, packet):
+        with self._cond:
+            while self.lossless and not self._closed and self._packet is not None and self._packet.seq > self._consumed_seq:
+                self._cond.wait(0.5)
+            if self._packet is not None and self._packet.seq > self._consumed_seq:
+                self.frames_dropped += 1
+            self._packet = packet
+            self.frames_in += 1
+            self._cond.notify_all()
+        if self.listener is not None:
+            with self.listener:
+                self.listener.notify_all()
+
+    def get(self, last_seq=-1, timeout=None):
+        # Block until a frame newer than last_seq is available; returns None on timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._packet is None or self._packet.seq <= last_seq:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            self._consumed_seq = max(self._consumed_seq, self._packet.seq)
+            if self.lossless:
+                self._cond.notify_all()
+            return self._packet
+
+    def peek(self):
+        with self._cond:
+            return self._packet
+
+    def take_if_newer(self, last_seq):
+        # Non-blocking get(): the newest packet if it is newer than last_seq, else None
+        with self._cond:
+            if self._packet is None or self._packet.seq <= last_seq:
+                return None
+            self._consumed_seq = max(self._consumed_seq, self._packet.seq)
+            if self.lossless:
+                self._cond.notify_all()
+            return self._packet
+
+    def close(self):
+        # Releases a writer blocked in a lossless put()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+# Outage schedules are keyed by source spec so they survive reconnects, which open a new SyntheticSource
+_synthetic_epochs = {}
+
+
+class SyntheticSource:
+    # Drop-in stand-in for cv2.VideoCapture that renders a moving box at a fixed rate.
+    # With outage_every/outage_for it simulates a camera that drops out ("fail": reads and
+    # reopens fail) or freezes ("stall": read() blocks, for up to read_timeout seconds if set,
+    # like a capture opened with CAP_PROP_READ_TIMEOUT_MSEC) on a fixed schedule.
+    def __init__(self, width=1280, height=720, fps=15, num_frames=None,
+                 outage_every=None, outage_for=0.0, outage_mode="fail", epoch_key=None, read_timeout=None):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.num_frames = num_frames
+        self.outage_every = outage_every
+        self.outage_for = outage_for
+        self.outage_mode = outage_mode
+        self.read_timeout = read_timeout
+        self._epoch = _synthetic_epochs.setdefault(epoch_key, time.monotonic()) if epoch_key else time.monotonic()
+        self._index = 0
+        self._next_ts = time.monotonic()
+        self._opened = not self._in_outage()
+
+    def _in_outage(self):
+        if not self.outage_every:
+            return False
+        phase = (time.monotonic() - self._epoch) % (self.outage_every + self.outage_for)
+        return phase >= self.outage_every
+
+    def isOpened(self):
+        return self._opened
+
+    def set(self, prop, value):
+        # Like most RTSP cameras, property hints are ignored; the rate comes from the source spec
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        return 0.0
+
+    def read(self):
+        if not self._opened or (self.num_frames is not None and self._index >= self.num_frames):
+            return False, None
+        if self._in_outage():
+            if self.outage_mode == "stall":
+                deadline = time.monotonic() + self.read_timeout if self.read_timeout else None
+                while self._opened and self._in_outage() and (deadline is None or time.monotonic() < deadline):
+                    time.sleep(0.05)
+            return False, None
+
+        if self.fps > 0:
+            delay = self._next_ts - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_ts = max(self._next_ts + 1.0 / self.fps, time.monotonic())
+
+        frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        box = min(self.width, self.height) // 6
+        x = (self._index * 8) % max(self.width - box, 1)
+        y = (self.height - box) // 2
+        cv2.rectangle(frame, (x, y), (x + box, y + box), (255, 255, 255), -1)
+        cv2.putText(frame, str(self._index), (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        self._index += 1
+        return True, frame
+
+    def release(self):
+        self._opened = False
+
+
+class FileSource:
+    # Wraps a local video file and paces reads to the file's fps so it behaves like a live camera
+    def __init__(self, path, loop=True, realtime=True):
+        self.path = path
+        self.loop = loop
+        self.realtime = realtime
+        self._cap = cv2.VideoCapture(path)
+        fps = self._cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps > 0 else 30
+        self._next_ts = time.monotonic()
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def set(self, prop, value):
+        return self._cap.set(prop, value)
+
+    def get(self, prop):
+        return self._cap.get(prop)
+
+    def read(self):
+        if self.realtime:
+            delay = self._next_ts - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_ts = max(self._next_ts + 1.0 / self.fps, time.monotonic())
+
+        ret, frame = self._cap.read()
+        if not ret and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._cap.read()
+        return ret, frame
+
+    def release(self):
+        self._cap.release()
+
+
+def open_source(path, open_timeout_ms=10000, read_timeout_ms=5000):
+    # "synthetic" or "synthetic:1920x1080@30" for the generator, a file path, or any URL cv2 accepts.
+    # The generator also takes outage options, e.g. "synthetic:1280x720@15?outage_every=20&outage_for=3&outage_mode=stall"
+    if path.startswith("synthetic"):
+        width, height, fps = 1280, 720, 15
+        spec, _, query = path.partition("?")
+        if ":" in spec:
+            size, _, rate = spec.split(":", 1)[1].partition("@")
+            if size:
+                width, height = (int(v) for v in size.lower().split("x"))
+            if rate:
+                fps = float(rate)
+        options = dict(item.partition("=")[::2] for item in query.split("&") if item)
+        return SyntheticSource(
+            width, height, fps,
+            outage_every=float(options["outage_every"]) if "outage_every" in options else None,
+            outage_for=float(options.get("outage_for", 0)),
+            outage_mode=options.get("outage_mode", "fail"),
+            epoch_key=path,
+            read_timeout=read_timeout_ms / 1000 if read_timeout_ms else None
+        )
+
+    if "://" not in path:
+        return FileSource(path)
+
+    # Bound open/read so a dead camera surfaces as a failed read instead of hanging (OpenCV >= 4.6; the
+    # FFmpeg backend only takes these at open time)
+    params = []
+    if hasattr(cv2, "CAP_PROP_OPEN_TIMEOUT_MSEC"):
+        params = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, open_timeout_ms, cv2.CAP_PROP_READ_TIMEOUT_MSEC, read_timeout_ms]
+    else:
+        print(f"OpenCV {cv2.__version__} has no capture timeouts; a dead camera can block read() on {path}")
+    cap = cv2.VideoCapture(path, cv2.CAP_ANY, params) if params else cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 2)
+    return cap
+
+
+class ReconnectPolicy:
+    # Exponential backoff with +/- jitter so a site full of cameras doesn't reconnect in lockstep
+    def __init__(self, initial_delay=0.5, max_delay=30.0, multiplier=2.0, jitter=0.3, max_attempts=None):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.max_attempts = max_attempts
+
+    def delay(self, attempt):
+        base = min(self.max_delay, self.initial_delay * (self.multiplier ** attempt))
+        return max(0.0, base * (1 + random.uniform(-self.jitter, self.jitter)))
+
+
+class CaptureThread(threading.Thread):
+    # Drains the source as fast as it delivers so the socket never backs up behind inference.
+    # `source` is either an opened capture or a zero-argument opener; with an opener and a
+    # ReconnectPolicy the thread reopens the source on failure instead of exiting.
+    def __init__(self, source, buffer, stop_event, name="capture", source_id=None, reconnect=None):
+        super().__init__(name=name, daemon=True)
+        self.opener = source if callable(source) else None
+        self.source = None if callable(source) else source
+        self.source_id = source_id
+        self.buffer = buffer
+        self.stop_event = stop_event
+        self.reconnect = reconnect if self.opener is not None else None
+        self.seq = 0
+        self.failed = threading.Event()
+        self._source_lock = threading.Lock()
+        self._stalled = threading.Event()
+
+        self.state = "connecting"
+        self.last_frame_ts = None
+        self.outage_start = None
+        self.outages = 0      # times the stream was lost
+        self.reconnects = 0   # attempts to reopen the source, successful or not
+        self._attempt = 0     # backoff step; runs for a whole outage and is reset by the first good frame
+        self.stalls = 0
+        self.read_failures = 0
+        self.last_recovery_s = None
+        self.total_downtime_s = 0.0
+
+    def _open(self):
+        source = self.opener()
+        if not source.isOpened():
+            source.release()
+            return None
+        return source
+
+    def _release(self):
+        with self._source_lock:
+            source, self.source = self.source, None
+        if source is not None:
+            try:
+                source.release()
+            except Exception as e:
+                print(f"[{self.name}] Error releasing source: {e}")
+
+    def mark_stalled(self):
+        # Called by the watchdog thread. Only flags the stall: OpenCV captures are not thread-safe, so the
+        # source is released by this thread's own loop once read() returns (bounded by the read timeout)
+        if self.state != "streaming":
+            return
+        self.stalls += 1
+        self.state = "stalled"
+        self._stalled.set()
+        print(f"[{self.name}] No frame for too long, forcing reconnect")
+
+    def _backoff(self, what):
+        # Waits out the next reconnect delay; False once the policy's attempts are used up
+        if self.reconnect is None or (self.reconnect.max_attempts is not None
+                                      and self._attempt + 1 >= self.reconnect.max_attempts):
+            return False
+        delay = self.reconnect.delay(self._attempt)
+        self._attempt += 1
+        print(f"[{self.name}] {what} (attempt {self._attempt}), retrying in {delay:.1f}s")
+        self.stop_event.wait(delay)
+        return True
+
+    def _connect(self):
+        while not self.stop_event.is_set():
+            if self.outage_start is not None or self._attempt > 0:
+                self.reconnects += 1
+            try:
+                source = self._open()
+            except Exception as e:
+                print(f"[{self.name}] Error opening source: {e}")
+                source = None
+            if source is not None:
+                with self._source_lock:
+                    self.source = source
+                return True
+            if not self._backoff("Reconnect failed"):
+                return False
+        return False
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                if self.source is None and not self._connect():
+                    if not self.stop_event.is_set():
+                        self.failed.set()
+                    break
+
+                source = self.source
+                read_start = time.perf_counter()
+                try:
+                    ret, frame = source.read() if source is not None else (False, None)
+                except Exception as e:
+                    print(f"[{self.name}] Error reading frame: {e}")
+                    ret, frame = False, None
+                if self._stalled.is_set():
+                    self._stalled.clear()
+                    ret = False
+
+                if not ret:
+                    print(f"[{self.name}] Failed to grab frame")
+                    self.read_failures += 1
+                    if self.reconnect is None:
+                        self.failed.set()
+                        break
+                    if self.outage_start is None:
+                        self.outage_start = self.last_frame_ts or time.monotonic()
+                        self.outages += 1
+                    self.state = "reconnecting"
+                    self._release()
+                    # A source that opens but never delivers would otherwise be reopened in a tight loop
+                    if not self._backoff("Read failed"):
+                        self.failed.set()
+                        break
+                    continue
+
+                now = time.monotonic()
+                if self.outage_start is not None:
+                    # Recovery time runs from the last good frame to the first frame after reconnecting
+                    self.last_recovery_s = now - self.outage_start
+                    self.total_downtime_s += self.last_recovery_s
+                    self.outage_start = None
+                    print(f"[{self.name}] Stream recovered after {self.last_recovery_s:.1f}s")
+                self._attempt = 0
+                self.state = "streaming"
+                self.last_frame_ts = now
+                read_time = time.perf_counter() - read_start
+                stage_metrics.record("capture", read_time)
+                tracer.span("capture", self.seq, self.source_id, read_time, end=now)
+                stage_metrics.frames_in.mark()
+
+                self.buffer.put(FramePacket(self.seq, frame, now, time.time(), self.source_id))
+                self.seq += 1
+        finally:
+            self.state = "stopped" if self.stop_event.is_set() else "failed"
+            self._release()
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'outages': self.outages,
+            'reconnects': self.reconnects,
+            'stalls': self.stalls,
+            'read_failures': self.read_failures,
+            'last_recovery_s': round(self.last_recovery_s, 2) if self.last_recovery_s is not None else None,
+            'total_downtime_s': round(self.total_downtime_s + (time.monotonic() - self.outage_start
+                                                              if self.outage_start is not None else 0), 2),
+            'seconds_since_frame': round(time.monotonic() - self.last_frame_ts, 2) if self.last_frame_ts else None,
+            'frames_in': self.buffer.frames_in,
+            'frames_dropped': self.buffer.frames_dropped,
+        }
+
+
+class StallWatchdog(threading.Thread):
+    # One thread watching every capture; fires when a streaming source delivers nothing for stall_timeout seconds
+    def __init__(self, captures, stall_timeout, stop_event, interval=0.5):
+        super().__init__(name="capture-watchdog", daemon=True)
+        self.captures = captures
+        self.stall_timeout = stall_timeout
+        self.stop_event = stop_event
+        self.interval = interval
+        self.fired = 0
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            now = time.monotonic()
+            for capture in list(self.captures):
+                if (capture.state == "streaming" and capture.last_frame_ts is not None
+                        and now - capture.last_frame_ts > self.stall_timeout):
+                    self.fired += 1
+                    capture.mark_stalled()
@@ -0,0 +1,106 @@
+import time
+
+import numpy as np
+
+
+def iou_matrix(a, b):
+    # Pairwise IoU between (N, 4) and (M, 4) x1,y1,x2,y2 boxes
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+class ChangeFilter:
+    # Decides whether a detection set differs enough from the last published one to be worth sending.
+    # A change means an object appeared or disappeared, or a box moved past the IoU / pixel thresholds,
+    # and it has to persist for `hysteresis_frames` frames so detector flicker isn't published.
+    # A keyframe is forced every `keyframe_interval` seconds so late joiners can resync.
+    def __init__(self, iou_threshold=0.7, pixel_threshold=20, hysteresis_frames=2, keyframe_interval=5.0):
+        self.iou_threshold = iou_threshold
+        self.pixel_threshold = pixel_threshold
+        self.hysteresis_frames = max(1, int(hysteresis_frames))
+        self.keyframe_interval = keyframe_interval
+        self._published = None
+        self._pending = 0
+        self._last_keyframe = None
+
+        self.frames = 0
+        self.published = 0
+        self.keyframes = 0
+        self.suppressed = 0
+
+    def _changed(self, detections):
+        previous = self._published
+        if len(previous) != len(detections):
+            return True
+        if not detections:
+            return False
+
+        # Greedy match per label by IoU; any unmatched object or moved box is a change
+        for label in {d['label'] for d in detections} | {d['label'] for d in previous}:
+            cur = [d['bbox'] for d in detections if d['label'] == label]
+            old = [d['bbox'] for d in previous if d['label'] == label]
+            if len(cur) != len(old):
+                return True
+            ious = iou_matrix(cur, old)
+            cur_boxes = np.asarray(cur, dtype=np.float32)
+            old_boxes = np.asarray(old, dtype=np.float32)
+            used = set()
+            for i in np.argsort(-ious.max(axis=1)):
+                order = [j for j in np.argsort(-ious[i]) if j not in used]
+                if not order:
+                    return True
+                j = order[0]
+                used.add(j)
+                if ious[i, j] < self.iou_threshold:
+                    return True
+                if np.abs(cur_boxes[i] - old_boxes[j]).max() > self.pixel_threshold:
+                    return True
+        return False
+
+    def update(self, detections, now=None):
+        # Returns (publish, keyframe)
+        now = time.monotonic() if now is None else now
+        self.frames += 1
+
+        if self._published is None or now - self._last_keyframe >= self.keyframe_interval:
+            self._accept(detections, now)
+            self.keyframes += 1
+            return True, True
+
+        if self._changed(detections):
+            self._pending += 1
+            if self._pending >= self.hysteresis_frames:
+                self._accept(detections, now, keyframe=False)
+                return True, False
+        else:
+            self._pending = 0
+
+        self.suppressed += 1
+        return False, False
+
+    def _accept(self, detections, now, keyframe=True):
+        self._published = list(detections)
+        self._pending = 0
+        self.published += 1
+        if keyframe:
+            self._last_keyframe = now
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'published': self.published,
+            'keyframes': self.keyframes,
+            'suppressed': self.suppressed,
+            'suppression_ratio': round(self.suppressed / self.frames, 3) if self.frames else 0,
+        }
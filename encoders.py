@@ -0,0 +1,102 @@
+import cv2
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420, TJSAMP_422, TJSAMP_444, TJFLAG_PROGRESSIVE
+except ImportError:
+    TurboJPEG = None
+
+# Chroma subsampling names accepted by every backend
+SUBSAMPLING = ('420', '422', '444')
+
+
+class JpegEncoder:
+    # Minimal interface: encode(BGR ndarray) -> bytes, or None if the frame could not be encoded
+    name = "base"
+
+    def encode(self, image):
+        raise NotImplementedError
+
+    def describe(self):
+        return {'backend': self.name}
+
+
+class OpenCVJpegEncoder(JpegEncoder):
+    def __init__(self, quality=75, progressive=False, optimize=False, subsampling='420'):
+        if subsampling not in SUBSAMPLING:
+            raise ValueError(f"Unknown chroma subsampling: {subsampling}")
+        self.name = "opencv-progressive" if progressive else "opencv-baseline"
+        self.quality = quality
+        self.progressive = progressive
+        self.optimize = optimize
+        self.subsampling = subsampling
+        self.params = [
+            int(cv2.IMWRITE_JPEG_QUALITY), int(quality),
+            int(cv2.IMWRITE_JPEG_PROGRESSIVE), 1 if progressive else 0,
+            int(cv2.IMWRITE_JPEG_OPTIMIZE), 1 if optimize else 0,
+        ]
+        # Sampling factor control needs OpenCV >= 4.5.5; older builds always use 4:2:0
+        sampling_flag = getattr(cv2, f"IMWRITE_JPEG_SAMPLING_FACTOR_{subsampling}", None)
+        if sampling_flag is not None:
+            self.params += [int(cv2.IMWRITE_JPEG_SAMPLING_FACTOR), int(sampling_flag)]
+
+    def encode(self, image):
+        ret, buffer = cv2.imencode('.jpg', image, self.params)
+        return buffer.tobytes() if ret else None
+
+    def describe(self):
+        return {'backend': self.name, 'quality': self.quality, 'optimize': self.optimize, 'subsampling': self.subsampling}
+
+
+class TurboJpegEncoder(JpegEncoder):
+    # libjpeg-turbo through PyTurboJPEG; builds optimized Huffman tables only for progressive output,
+    # so `optimize` has no separate effect here
+    name = "turbojpeg"
+    _instance = None
+
+    def __init__(self, quality=75, progressive=False, optimize=False, subsampling='420'):
+        if TurboJPEG is None:
+            raise RuntimeError("PyTurboJPEG is not installed")
+        if subsampling not in SUBSAMPLING:
+            raise ValueError(f"Unknown chroma subsampling: {subsampling}")
+        if TurboJpegEncoder._instance is None:
+            TurboJpegEncoder._instance = TurboJPEG()
+        self.quality = quality
+        self.progressive = progressive
+        self.optimize = optimize
+        self.subsampling = subsampling
+        self._subsample = {'420': TJSAMP_420, '422': TJSAMP_422, '444': TJSAMP_444}[subsampling]
+        self._flags = TJFLAG_PROGRESSIVE if progressive else 0
+
+    def encode(self, image):
+        return self._instance.encode(image, quality=int(self.quality), pixel_format=TJPF_BGR,
+                                     jpeg_subsample=self._subsample, flags=self._flags)
+
+    def describe(self):
+        return {'backend': self.name, 'quality': self.quality, 'progressive': self.progressive,
+                'subsampling': self.subsampling}
+
+
+def turbojpeg_available():
+    if TurboJPEG is None:
+        return False
+    try:
+        TurboJPEG()
+        return True
+    except Exception:
+        return False
+
+
+def make_encoder(backend="opencv-baseline", quality=75, subsampling='420', optimize=False):
+    # backend: "opencv-baseline" (alias "opencv"), "opencv-progressive" or "turbojpeg".
+    # TurboJPEG falls back to OpenCV baseline when the library is missing.
+    if backend in ("opencv", "opencv-baseline"):
+        return OpenCVJpegEncoder(quality, progressive=False, optimize=optimize, subsampling=subsampling)
+    if backend == "opencv-progressive":
+        return OpenCVJpegEncoder(quality, progressive=True, optimize=optimize, subsampling=subsampling)
+    if backend == "turbojpeg":
+        try:
+            return TurboJpegEncoder(quality, optimize=optimize, subsampling=subsampling)
+        except Exception as e:
+            print(f"TurboJPEG unavailable ({e}), using OpenCV baseline encoder")
+            return OpenCVJpegEncoder(quality, progressive=False, optimize=optimize, subsampling=subsampling)
+    raise ValueError(f"Unknown JPEG encoder backend: {backend}")
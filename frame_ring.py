@@ -0,0 +1,177 @@
+import functools
+import math
+import queue
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Per-slot header; version is 0 while the writer is filling the slot
+SLOT_HEADER = np.dtype([('version', '<i8'), ('seq', '<i8'), ('capture_ts', '<f8'), ('wall_ts', '<f8')])
+HEADER_ALIGN = 64
+
+
+class FrameRing:
+    # Preallocated frame slots in one shared memory block: a header per slot, then `slots` uint8 frames of
+    # `shape`. One process writes; readers get numpy views straight onto the block, so a frame is never
+    # copied on the reading side. Slots are reused round-robin, so a reader holding a view checks valid()
+    # afterwards to find out whether the writer lapped it in the meantime.
+    def __init__(self, shm, slots, shape, owner=False, readonly=False):
+        self.shm = shm
+        self.name = shm.name
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.owner = owner
+        self.headers = np.ndarray((slots,), dtype=SLOT_HEADER, buffer=shm.buf)
+        offset = -(-self.headers.nbytes // HEADER_ALIGN) * HEADER_ALIGN
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+        if readonly:
+            self.frames.flags.writeable = False
+            self.headers.flags.writeable = False
+        self.version = 0
+
+    @staticmethod
+    def size_for(slots, shape):
+        header = -(-slots * SLOT_HEADER.itemsize // HEADER_ALIGN) * HEADER_ALIGN
+        return header + slots * math.prod(shape)
+
+    @classmethod
+    def create(cls, slots, shape, readonly=False):
+        shm = shared_memory.SharedMemory(create=True, size=cls.size_for(slots, shape))
+        ring = cls(shm, slots, shape, owner=True)
+        ring.headers[:] = 0
+        if readonly:
+            ring.frames.flags.writeable = False
+            ring.headers.flags.writeable = False
+        return ring
+
+    @classmethod
+    def attach(cls, name, slots, shape, readonly=True):
+        return cls(shared_memory.SharedMemory(name=name), slots, shape, readonly=readonly)
+
+    def spec(self):
+        # Everything another process needs to attach()
+        return {'name': self.name, 'slots': self.slots, 'shape': self.shape}
+
+    def write(self, frame, seq=None, capture_ts=None, wall_ts=None):
+        # Returns (slot, version); the pair is what goes in the message to readers
+        if frame.shape != self.shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match ring slots {self.shape}")
+        self.version += 1
+        slot = self.version % self.slots
+        header = self.headers[slot:slot + 1]
+        header['version'] = 0
+        np.copyto(self.frames[slot], frame)
+        header['seq'] = -1 if seq is None else seq
+        header['capture_ts'] = math.nan if capture_ts is None else capture_ts
+        header['wall_ts'] = math.nan if wall_ts is None else wall_ts
+        header['version'] = self.version
+        return slot, self.version
+
+    def valid(self, slot, version):
+        return int(self.headers['version'][slot]) == version
+
+    def read(self, slot, version):
+        # (frame view, seq, capture_ts, wall_ts), or None if the slot already holds a newer frame
+        header = self.headers[slot].copy()
+        if int(header['version']) != version or not self.valid(slot, version):
+            return None
+        seq, capture_ts, wall_ts = int(header['seq']), float(header['capture_ts']), float(header['wall_ts'])
+        return (self.frames[slot],
+                None if seq < 0 else seq,
+                None if math.isnan(capture_ts) else capture_ts,
+                None if math.isnan(wall_ts) else wall_ts)
+
+    def close(self):
+        self.headers = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # A view is still referenced somewhere (e.g. the last published frame); the mapping goes with the process
+            pass
+
+    def unlink(self):
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class RingPublisher:
+    # Inference-process side: copies each display frame into its camera's ring and sends the small record
+    # describing it. Never blocks; when the reader falls behind and the channel is full the record is dropped.
+    def __init__(self, rings, channel):
+        self.rings = rings
+        self.channel = channel
+        self.sent = 0
+        self.dropped = 0
+
+    def publish(self, cam_id, frame, detections, stats=None, seq=None, timestamp=None, keyframe=False, capture_ts=None):
+        slot, version = self.rings[cam_id].write(frame, seq, capture_ts, timestamp)
+        self._send(('frame', cam_id, slot, version, detections, stats, keyframe))
+
+    def send_stats(self, report):
+        self._send(('stats', report))
+
+    def _send(self, message):
+        try:
+            self.channel.put_nowait(message)
+            self.sent += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self):
+        return {'sent': self.sent, 'dropped': self.dropped}
+
+
+class RingSubscriber(threading.Thread):
+    # Web-process side: drains the channel and hands each frame on as a read-only view of its ring slot.
+    # on_frame(cam_id, frame, detections, stats, seq, timestamp, keyframe, capture_ts, is_valid) gets an
+    # is_valid() callable that turns false once the slot has been overwritten; on_stats(report) gets
+    # whatever the inference process passed to send_stats().
+    def __init__(self, channel, rings, stop_event, on_frame, on_stats):
+        super().__init__(name="ring-subscriber", daemon=True)
+        self.channel = channel
+        self.rings = rings
+        self.stop_event = stop_event
+        self.on_frame = on_frame
+        self.on_stats = on_stats
+        self.frames = 0
+        self.stale = 0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                message = self.channel.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            try:
+                if message[0] == 'stats':
+                    self.on_stats(message[1])
+                    continue
+                _, cam_id, slot, version, detections, stats, keyframe = message
+                ring = self.rings[cam_id]
+                entry = ring.read(slot, version)
+                if entry is None:
+                    # More than a ring's worth behind; newer records for this camera are already queued
+                    self.stale += 1
+                    continue
+                frame, seq, capture_ts, wall_ts = entry
+                self.frames += 1
+                self.on_frame(cam_id, frame, detections, stats, seq, wall_ts, keyframe, capture_ts,
+                              functools.partial(ring.valid, slot, version))
+            except Exception as e:
+                print(f"Error handling inference record: {e}")
+
+    def stats(self):
+        return {'frames': self.frames, 'stale': self.stale, 'pending': _qsize(self.channel)}
+
+
+def _qsize(channel):
+    try:
+        return channel.qsize()
+    except NotImplementedError:  # macOS
+        return None
@@ -0,0 +1,86 @@
+import collections
+import threading
+
+import cv2
+import numpy as np
+
+# Grey the padding is filled with, as the YOLO family is trained on
+PAD_VALUE = 114
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def letterbox_for(source_size, model_size=(640, 640)):
+    # Shared Letterbox per (source, model) geometry, so cameras of the same size share one buffer pool
+    key = (tuple(source_size), tuple(model_size))
+    with _cache_lock:
+        letterbox = _cache.get(key)
+        if letterbox is None:
+            letterbox = _cache[key] = Letterbox(*key)
+        return letterbox
+
+
+class Letterbox:
+    # Aspect-correct fit of a source frame into the model input: one uniform scale, then centred on a
+    # PAD_VALUE border. Model input buffers come from a small pool and only their image area is rewritten,
+    # since the border never changes for a given geometry. Boxes in model input pixels map back to source
+    # pixels as (box - pad) / scale, and to any output size with one more per-axis gain on top.
+    def __init__(self, source_size, model_size=(640, 640)):
+        self.source_size = tuple(source_size)
+        self.model_size = tuple(model_size)
+        source_w, source_h = self.source_size
+        model_w, model_h = self.model_size
+        self.scale = min(model_w / source_w, model_h / source_h)
+        self.resized = (max(1, round(source_w * self.scale)), max(1, round(source_h * self.scale)))
+        self.pad = ((model_w - self.resized[0]) // 2, (model_h - self.resized[1]) // 2)
+        self._free = collections.deque()
+        self._affines = {}
+        self.allocated = 0
+
+    def acquire(self):
+        # A model input buffer with the border already filled; hand it back with release() once inferred
+        try:
+            return self._free.pop()
+        except IndexError:
+            self.allocated += 1
+            return np.full((self.model_size[1], self.model_size[0], 3), PAD_VALUE, dtype=np.uint8)
+
+    def release(self, buffer):
+        self._free.append(buffer)
+
+    def apply(self, frame, out=None):
+        # Resizes straight into the image area of `out` (a buffer from acquire(), or a fresh one)
+        if out is None:
+            out = np.full((self.model_size[1], self.model_size[0], 3), PAD_VALUE, dtype=np.uint8)
+        pad_x, pad_y = self.pad
+        width, height = self.resized
+        area = out[pad_y:pad_y + height, pad_x:pad_x + width]
+        interpolation = cv2.INTER_AREA if self.scale < 1 else cv2.INTER_LINEAR
+        cv2.resize(frame, self.resized, dst=area, interpolation=interpolation)
+        return out
+
+    def _affine(self, output_size):
+        # (gain, offset) as length-4 rows for x1,y1,x2,y2: output = model * gain + offset
+        affine = self._affines.get(output_size)
+        if affine is None:
+            gain_x = output_size[0] / self.resized[0]
+            gain_y = output_size[1] / self.resized[1]
+            gain = np.array([gain_x, gain_y] * 2, dtype=np.float32)
+            offset = -np.array(self.pad * 2, dtype=np.float32) * gain
+            limit = np.array(output_size * 2, dtype=np.float32)
+            affine = self._affines[output_size] = (gain, offset, limit)
+        return affine
+
+    def to_output(self, boxes, output_size=None):
+        # (N, 4) model input boxes -> (N, 4) float32 boxes in an output_size frame (default: the source),
+        # clipped to it since the model may place boxes partly on the border
+        gain, offset, limit = self._affine(tuple(output_size or self.source_size))
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        return np.clip(boxes * gain + offset, 0, limit)
+
+    def to_model(self, boxes):
+        # (N, 4) source pixel boxes -> model input pixels
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        return boxes * np.float32(self.scale) + np.array(self.pad * 2, dtype=np.float32)
+
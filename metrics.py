@@ -0,0 +1,178 @@
+import bisect
+import os
+import resource
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Histogram bucket upper bounds in milliseconds, roughly log spaced; anything slower lands in the overflow bucket
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 50, 75, 100, 150, 200, 300, 500, 750,
+                      1000, 2000, 5000)
+
+# Stage durations, then end-to-end latencies measured from the frame's capture time
+STAGES = ("capture", "resize", "inference", "track", "overlay", "encode", "udp_send", "total",
+          "capture_to_inference", "capture_to_udp", "capture_to_mjpeg")
+
+
+class LatencyHistogram:
+    # Fixed-size bucket counts. record() is a bisect and two increments with no lock; the GIL keeps it
+    # consistent enough for monitoring and a rare lost sample under contention doesn't matter.
+    __slots__ = ('bounds', 'counts', 'sum_ms', 'max_ms')
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1000.0
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.sum_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def snapshot(self):
+        return list(self.counts), self.sum_ms
+
+    def percentile(self, q, counts=None):
+        # Linear interpolation inside the bucket holding the q-th sample, capped at the largest sample seen
+        counts = self.counts if counts is None else counts
+        total = sum(counts)
+        if total == 0:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else max(self.max_ms, lower)
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max_ms)
+            seen += count
+        return self.max_ms
+
+    def summary(self, previous=None):
+        # Percentiles over everything recorded since `previous` (a snapshot()), or since start
+        counts, sum_ms = self.snapshot()
+        if previous is not None:
+            counts = [c - p for c, p in zip(counts, previous[0])]
+            sum_ms -= previous[1]
+        total = sum(counts)
+        return {
+            'count': total,
+            'mean_ms': round(sum_ms / total, 2) if total else 0,
+            'p50_ms': round(self.percentile(0.50, counts), 2),
+            'p95_ms': round(self.percentile(0.95, counts), 2),
+            'p99_ms': round(self.percentile(0.99, counts), 2),
+        }
+
+
+class RateMeter:
+    # Event counter; rate() reports events per second since the previous rate() call
+    __slots__ = ('count', '_last_count', '_last_time')
+
+    def __init__(self):
+        self.count = 0
+        self._last_count = 0
+        self._last_time = time.monotonic()
+
+    def mark(self, n=1):
+        self.count += n
+
+    def rate(self):
+        now = time.monotonic()
+        count = self.count
+        elapsed = now - self._last_time
+        rate = (count - self._last_count) / elapsed if elapsed > 0 else 0.0
+        self._last_count, self._last_time = count, now
+        return rate
+
+
+class StageMetrics:
+    # One histogram per pipeline stage plus input (captured) and output (published) frame rates.
+    # Hot paths only call record() / mark(); all aggregation happens in stats().
+    def __init__(self, stages=STAGES):
+        self.histograms = {stage: LatencyHistogram() for stage in stages}
+        self.frames_in = RateMeter()
+        self.frames_out = RateMeter()
+        self.start_time = time.monotonic()
+        self._previous = {}
+
+    def record(self, stage, seconds):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms.setdefault(stage, LatencyHistogram())
+        histogram.record(seconds)
+
+    def histogram(self, stage):
+        return self.histograms.get(stage)
+
+    def stats(self):
+        # Percentiles and fps cover the interval since the previous call, so this has one reader
+        # (monitor_performance); the cumulative counts stay available through histogram()
+        stages = {}
+        for stage, histogram in list(self.histograms.items()):
+            stages[stage] = histogram.summary(self._previous.get(stage))
+            self._previous[stage] = histogram.snapshot()
+        return {
+            'input_fps': round(self.frames_in.rate(), 1),
+            'output_fps': round(self.frames_out.rate(), 1),
+            'frames_in': self.frames_in.count,
+            'frames_out': self.frames_out.count,
+            'stages': stages,
+        }
+
+    def export(self):
+        # Cumulative counts for handing to another process's StageMetrics.absorb()
+        return {
+            'histograms': {stage: (list(h.counts), h.sum_ms, h.max_ms)
+                           for stage, h in list(self.histograms.items()) if h.max_ms > 0},
+            'frames_in': self.frames_in.count,
+            'frames_out': self.frames_out.count,
+        }
+
+    def absorb(self, exported):
+        # Take over the stages and frame counts another process measures (the inference process in split
+        # mode); stages only recorded here, like encode, are left alone
+        for stage, (counts, sum_ms, max_ms) in exported['histograms'].items():
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms.setdefault(stage, LatencyHistogram())
+            histogram.counts, histogram.sum_ms, histogram.max_ms = list(counts), sum_ms, max_ms
+        self.frames_in.count = exported['frames_in']
+        self.frames_out.count = exported['frames_out']
+
+
+# Shared by the capture, pipeline, encoder and UDP threads
+stage_metrics = StageMetrics()
+
+
+def _rss_bytes():
+    # Current resident set size from /proc; falls back to the peak from getrusage elsewhere
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def process_stats():
+    # CPU seconds, resident memory and thread count of this process; uses psutil when installed
+    if psutil is not None:
+        process = psutil.Process()
+        cpu = process.cpu_times()
+        return {
+            'cpu_seconds': round(cpu.user + cpu.system, 2),
+            'rss_bytes': process.memory_info().rss,
+            'threads': process.num_threads(),
+        }
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 2),
+        'rss_bytes': _rss_bytes(),
+        'threads': threading.active_count(),
+    }
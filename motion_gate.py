@@ -0,0 +1,102 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    # Decides which frames are worth sending to the model. Each frame is shrunk to a small grayscale
+    # image and compared with a running-average background of its source; the model only runs when
+    # more than `threshold` of the pixels differ by over `pixel_delta` grey levels, or when
+    # `refresh_interval` seconds have passed since the source's last inference. A skipped frame is a
+    # gate hit. background_rate=1.0 turns this into plain differencing against the previous frame.
+    def __init__(self, size=(160, 90), pixel_delta=25, threshold=0.005, background_rate=0.05, refresh_interval=10.0):
+        self.size = tuple(size)
+        self.pixel_delta = pixel_delta
+        self.threshold = threshold
+        self.background_rate = background_rate
+        self.refresh_interval = refresh_interval
+
+        self._lock = threading.Lock()
+        self._sources = {}
+        self._inference_s = None
+
+        self.checked = 0
+        self.skipped = 0
+        self.forced = 0
+        self.check_time = 0.0
+        self.saved_s = 0.0
+
+    def _source(self, source_id):
+        state = self._sources.get(source_id)
+        if state is None:
+            state = self._sources[source_id] = {
+                'background': None, 'last_inference': None, 'motion': 0.0, 'checked': 0, 'skipped': 0,
+            }
+        return state
+
+    def motion(self, state, frame):
+        # Fraction of changed pixels against the source's background, which is then updated with this frame
+        start = time.perf_counter()
+        # Strided view to twice the target size first, so INTER_AREA averages far fewer pixels but still smooths noise
+        step = max(1, frame.shape[1] // (self.size[0] * 2))
+        small = cv2.resize(frame[::step, ::step], self.size, interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        background = state['background']
+        if background is None:
+            state['background'] = small.astype(np.float32)
+            motion = 1.0
+        else:
+            diff = cv2.absdiff(small, cv2.convertScaleAbs(background))
+            motion = float(np.count_nonzero(diff > self.pixel_delta)) / diff.size
+            cv2.accumulateWeighted(small, background, self.background_rate)
+        self.check_time += time.perf_counter() - start
+        return motion
+
+    def check(self, packet):
+        # True if the packet's frame should go to the model
+        with self._lock:
+            state = self._source(packet.source_id)
+        motion = self.motion(state, packet.frame)
+        now = packet.capture_ts
+
+        with self._lock:
+            state['motion'] = motion
+            state['checked'] += 1
+            self.checked += 1
+            due = state['last_inference'] is None or now - state['last_inference'] >= self.refresh_interval
+            if motion >= self.threshold or due:
+                if motion < self.threshold:
+                    self.forced += 1
+                state['last_inference'] = now
+                return True
+            state['skipped'] += 1
+            self.skipped += 1
+            # Credited at the running average inference time, since the skipped call never happened
+            self.saved_s += self._inference_s or 0.0
+            return False
+
+    def record_inference(self, seconds):
+        with self._lock:
+            self._inference_s = seconds if self._inference_s is None else self._inference_s * 0.9 + seconds * 0.1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'checked': self.checked,
+                'skipped': self.skipped,
+                'forced_refreshes': self.forced,
+                'hit_rate': round(self.skipped / self.checked, 3) if self.checked else 0,
+                'saved_ms': round(self.saved_s * 1000, 1),
+                'avg_check_ms': round(self.check_time / self.checked * 1000, 3) if self.checked else 0,
+                'sources': {
+                    source_id: {
+                        'motion': round(s['motion'], 4),
+                        'checked': s['checked'],
+                        'skipped': s['skipped'],
+                        'hit_rate': round(s['skipped'] / s['checked'], 3) if s['checked'] else 0,
+                    }
+                    for source_id, s in self._sources.items()
+                },
+            }
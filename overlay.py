@@ -0,0 +1,33 @@
+import cv2
+
+
+def scale_detections(results, timestamp, letterbox, display_size=(1280, 720)):
+    # Model-space results -> detection dicts with boxes in display pixels; every box goes through the
+    # letterbox transform in one array operation
+    if not results:
+        return []
+    boxes = letterbox.to_output([det["bbox"] for det in results], display_size).astype(int).tolist()
+    return [
+        {"label": det["label"], "score": float(det["score"]), "bbox": box, "timestamp": timestamp}
+        for det, box in zip(results, boxes)
+    ]
+
+
+def draw_detections(display_frame, detections):
+    for det in detections:
+        x1, y1, x2, y2 = det["bbox"]
+        caption = f"{det['label']} {det['score']:.2f}"
+        if det.get("track_id") is not None:
+            caption = f"#{det['track_id']} {caption}"
+        cv2.rectangle(display_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(display_frame, caption, (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 2)
+    return display_frame
+
+
+def render_detections(frame, results, timestamp, letterbox, display_size=(1280, 720)):
+    # Maps model-space boxes to the display frame, draws them, and returns (display_frame, detections).
+    # Used by the offline benchmark; the server's postprocess stage runs the steps itself so a tracker
+    # can sit between scaling and drawing.
+    detections = scale_detections(results, timestamp, letterbox, display_size)
+    display_frame = draw_detections(cv2.resize(frame, display_size), detections)
+    return display_frame, detections
@@ -0,0 +1,395 @@
+import collections
+import threading
+import time
+
+from letterbox import letterbox_for
+from metrics import stage_metrics
+from tracing import tracer
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+
+
+class StageQueue:
+    # Bounded hand-off between stages; on overflow either evicts the oldest item,
+    # rejects the new one, or blocks the producer
+    def __init__(self, maxsize=2, drop_policy=DROP_OLDEST, name="queue"):
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.maxsize = max(1, int(maxsize))
+        self.drop_policy = drop_policy
+        self.name = name
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item, timeout=None):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.drop_policy == DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                elif self.drop_policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                else:
+                    deadline = None if timeout is None else time.monotonic() + timeout
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            self.dropped += 1
+                            return False
+                        self._cond.wait(remaining)
+            if self._closed:
+                return False
+            self._items.append(item)
+            self.put_count += 1
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        # Returns None on timeout or once the queue is closed and drained
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._items:
+                if self._closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def wait_for_space(self, timeout=None):
+        # Lets a producer pull work only when it can hand it on, so frames are dropped at the
+        # latest-frame buffer rather than after a scheduler already picked them
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while len(self._items) >= self.maxsize and not self._closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return not self._closed
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def depth(self):
+        with self._cond:
+            return len(self._items)
+
+    def stats(self):
+        with self._cond:
+            return {'depth': len(self._items), 'maxsize': self.maxsize, 'dropped': self.dropped, 'put': self.put_count}
+
+
+class FrameJob:
+    # Everything one captured frame accumulates on its way through the stages
+    __slots__ = ('packet', 'model_frame', 'letterbox', 'result', 'detections', 'display_frame', 'timings', 'skip',
+                 'tiles')
+
+    def __init__(self, packet):
+        self.packet = packet
+        self.model_frame = None
+        # Letterbox the result's boxes are relative to (model input pixels of the whole frame)
+        self.letterbox = None
+        self.result = None
+        self.detections = []
+        self.display_frame = None
+        self.timings = {}
+        # Why the frame skipped the model ("motion" or "rate"), else None; result is then the source's previous one
+        self.skip = None
+        # TilePlan when the source is tiled; model_frame is then the list of tile inputs
+        self.tiles = None
+
+
+class StageWorker(threading.Thread):
+    # Generic worker: pulls a job, runs fn(job), forwards the job unless fn returned None
+    def __init__(self, name, fn, in_queue, out_queue, stop_event):
+        super().__init__(name=name, daemon=True)
+        self.fn = fn
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stop_event = stop_event
+        self.processed = 0
+        self.busy_time = 0.0
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                if self.out_queue is not None and not self.out_queue.wait_for_space(timeout=0.5):
+                    if self.out_queue.closed:
+                        break
+                    continue
+                job = self.in_queue.get(timeout=0.5)
+                if job is None:
+                    if self.in_queue.closed:
+                        break
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    job = self.fn(job)
+                except Exception as e:
+                    print(f"Error in {self.name} stage: {e}")
+                    job = None
+                self.busy_time += time.perf_counter() - start
+                self.processed += 1
+
+                if job is not None and self.out_queue is not None:
+                    self.out_queue.put(job)
+        finally:
+            if self.out_queue is not None:
+                self.out_queue.close()
+
+
+class InferenceWorker(threading.Thread):
+    # Feeds the model through predict_batch so several frames are in flight on the accelerator at once
+    def __init__(self, model, in_queue, out_queue, stop_event, name="infer", rate_controller=None, motion_gate=None):
+        super().__init__(name=name, daemon=True)
+        self.model = model
+        self.rate_controller = rate_controller
+        self.motion_gate = motion_gate
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stop_event = stop_event
+        self.submitted = 0
+        self.processed = 0
+        self.passed_through = 0
+        self.tiles_submitted = 0
+        self.error = None
+        self.last_results = {}
+        self._held = collections.deque()
+        self._order_lock = threading.Lock()
+
+    def _frames(self):
+        while not self.stop_event.is_set():
+            job = self.in_queue.get(timeout=0.5)
+            if job is None:
+                if self.in_queue.closed:
+                    return
+                continue
+            if job.skip:
+                self._pass_through(job)
+                continue
+            job.timings['infer_submit'] = time.monotonic()
+            self.submitted += 1
+            if job.tiles is None:
+                yield (job.model_frame, job)
+                continue
+            # All of a frame's tiles go in back to back so the device pipelines them like one batch
+            for index, tile in enumerate(job.model_frame):
+                self.tiles_submitted += 1
+                yield (tile, (job, index))
+
+    def in_flight(self):
+        return self.submitted - self.processed
+
+    def _pass_through(self, job):
+        # A frame that skips the model must not overtake frames still on the model, so it waits until every frame
+        # submitted before it has come back and then carries its source's latest result forward
+        with self._order_lock:
+            if self.processed >= self.submitted:
+                self._emit_skipped(job)
+            else:
+                self._held.append((self.submitted, job))
+
+    def _emit_skipped(self, job):
+        # Called with _order_lock held; a source with no result yet has nothing to carry forward
+        last = self.last_results.get(job.packet.source_id)
+        if last is None:
+            return
+        job.result, job.letterbox = last
+        job.timings['infer_submit'] = job.timings['infer_done'] = time.monotonic()
+        self.passed_through += 1
+        self.out_queue.put(job)
+
+    def run(self):
+        try:
+            for result in self.model.predict_batch(self._frames()):
+                job = result.info
+                if isinstance(job, tuple):
+                    job, index = job
+                    if not job.tiles.add(index, result):
+                        continue
+                    result = job.tiles.merge(job)
+                elif job.letterbox is not None:
+                    # The device is done with the input buffer; the next frame of this geometry reuses it
+                    job.letterbox.release(job.model_frame)
+                job.model_frame = None
+                job.result = result
+                job.timings['infer_done'] = time.monotonic()
+                packet = job.packet
+                infer_time = job.timings['infer_done'] - job.timings['infer_submit']
+                stage_metrics.record("inference", infer_time)
+                stage_metrics.record("capture_to_inference", job.timings['infer_done'] - packet.capture_ts)
+                tracer.span("inference", packet.seq, packet.source_id, infer_time, end=job.timings['infer_done'])
+                if self.rate_controller is not None:
+                    self.rate_controller.record_inference(
+                        job.timings['infer_submit'], job.timings['infer_done'], job.packet.capture_ts)
+                if self.motion_gate is not None:
+                    self.motion_gate.record_inference(infer_time)
+                with self._order_lock:
+                    self.last_results[packet.source_id] = (result, job.letterbox)
+                    self.out_queue.put(job)
+                    self.processed += 1
+                    while self._held and self._held[0][0] <= self.processed:
+                        self._emit_skipped(self._held.popleft()[1])
+        except Exception as e:
+            self.error = e
+            print(f"Error in inference stage: {e}")
+        finally:
+            self.out_queue.close()
+
+
+class RoundRobinScheduler:
+    # Hands out the next fresh frame from each source in turn so a busy camera cannot starve the others
+    def __init__(self, buffers, listener=None):
+        self.buffers = list(buffers)  # [(source_id, LatestFrameBuffer)]
+        self.listener = listener or threading.Condition()
+        for _, buf in self.buffers:
+            buf.listener = self.listener
+        self._last_seq = {source_id: -1 for source_id, _ in self.buffers}
+        self._next = 0
+        self.served = {source_id: 0 for source_id, _ in self.buffers}
+
+    def _poll(self):
+        count = len(self.buffers)
+        for offset in range(count):
+            index = (self._next + offset) % count
+            source_id, buf = self.buffers[index]
+            packet = buf.take_if_newer(self._last_seq[source_id])
+            if packet is not None:
+                self._last_seq[source_id] = packet.seq
+                self._next = (index + 1) % count
+                self.served[source_id] += 1
+                return packet
+        return None
+
+    def get(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.listener:
+            while True:
+                packet = self._poll()
+                if packet is not None:
+                    return packet
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.listener.wait(remaining)
+
+
+class VideoPipeline:
+    # feeder -> preprocess -> infer -> postprocess, each on its own thread with bounded queues in between.
+    # The feeder pulls from a scheduler, so any number of sources can share one model.
+    # With display_skipped, frames the rate controller keeps from the model still reach postprocess
+    # (in order, with skip="rate") so something like a tracker can fill them in.
+    def __init__(self, scheduler, model, postprocess, stop_event,
+                 model_size=(640, 640), queue_depth=2, drop_policy=DROP_OLDEST, rate_controller=None, motion_gate=None,
+                 display_skipped=False, tile_layouts=None):
+        self.scheduler = scheduler
+        self.model = model
+        self.model_size = model_size
+        self.rate_controller = rate_controller
+        self.motion_gate = motion_gate
+        self.display_skipped = display_skipped
+        # {source_id: TileLayout} for sources inferred as tiles at native resolution instead of one resize
+        self.tile_layouts = dict(tile_layouts or {})
+        self.stop_event = stop_event
+
+        self.preprocess_queue = StageQueue(queue_depth, drop_policy, "preprocess")
+        self.infer_queue = StageQueue(queue_depth, drop_policy, "infer")
+        self.postprocess_queue = StageQueue(queue_depth, drop_policy, "postprocess")
+
+        self.feeder = threading.Thread(target=self._feed, name="feeder", daemon=True)
+        self.preprocessor = StageWorker("preprocess", self._preprocess, self.preprocess_queue, self.infer_queue, stop_event)
+        self.inference = InferenceWorker(model, self.infer_queue, self.postprocess_queue, stop_event,
+                                         rate_controller=rate_controller, motion_gate=motion_gate)
+        self.postprocessor = StageWorker("postprocess", postprocess, self.postprocess_queue, None, stop_event)
+        self.threads = [self.feeder, self.preprocessor, self.inference, self.postprocessor]
+
+        self.start_time = None
+
+    def _feed(self):
+        try:
+            while not self.stop_event.is_set():
+                if not self.preprocess_queue.wait_for_space(timeout=0.5):
+                    continue
+                packet = self.scheduler.get(timeout=0.5)
+                if packet is None:
+                    continue
+                job = FrameJob(packet)
+                if self.rate_controller is not None and not self.rate_controller.admit(packet):
+                    if not self.display_skipped:
+                        continue
+                    job.skip = "rate"
+                self.preprocess_queue.put(job)
+        finally:
+            self.preprocess_queue.close()
+
+    def _preprocess(self, job):
+        if job.skip:
+            return job
+        if self.motion_gate is not None and not self.motion_gate.check(job.packet):
+            # Nothing moved: skip the resize and the model, the inference stage passes it through in order
+            job.skip = "motion"
+            return job
+        start = time.perf_counter()
+        frame = job.packet.frame
+        job.letterbox = letterbox_for((frame.shape[1], frame.shape[0]), self.model_size)
+        layout = self.tile_layouts.get(job.packet.source_id)
+        if layout is not None:
+            job.model_frame, job.tiles = layout.plan(frame, self.model_size)
+        else:
+            job.model_frame = job.letterbox.apply(frame, job.letterbox.acquire())
+        elapsed = time.perf_counter() - start
+        stage_metrics.record("resize", elapsed)
+        tracer.span("resize", job.packet.seq, job.packet.source_id, elapsed)
+        return job
+
+    def start(self):
+        self.start_time = time.monotonic()
+        for t in self.threads:
+            t.start()
+
+    def stop(self):
+        self.stop_event.set()
+        for q in (self.preprocess_queue, self.infer_queue, self.postprocess_queue):
+            q.close()
+
+    def join(self, timeout=None):
+        for t in self.threads:
+            t.join(timeout)
+
+    def is_alive(self):
+        return any(t.is_alive() for t in self.threads)
+
+    def stats(self):
+        elapsed = time.monotonic() - self.start_time if self.start_time else 0
+        completed = self.postprocessor.processed
+        return {
+            'throughput_fps': round(completed / elapsed, 1) if elapsed > 0 else 0,
+            'completed': completed,
+            'in_flight': self.inference.in_flight(),
+            'skipped_inference': self.inference.passed_through,
+            'tiles_submitted': self.inference.tiles_submitted,
+            'scheduled': dict(self.scheduler.served),
+            'queues': {q.name: q.stats() for q in (self.preprocess_queue, self.infer_queue, self.postprocess_queue)},
+            'busy_ms': {
+                'preprocess': round(self.preprocessor.busy_time * 1000, 1),
+                'postprocess': round(self.postprocessor.busy_time * 1000, 1),
+            },
+            'tiling': {source_id: layout.stats() for source_id, layout in self.tile_layouts.items()},
+        }
@@ -0,0 +1,71 @@
+import math
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if value is None:
+        return "NaN"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class MetricsWriter:
+    # Builds a Prometheus text-format page. Each metric family is written once with its HELP/TYPE
+    # lines; samples are (labels dict, value) pairs or a bare value.
+    def __init__(self, prefix="spectra"):
+        self.prefix = prefix
+        self._lines = []
+
+    def _name(self, name):
+        return f"{self.prefix}_{name}" if self.prefix else name
+
+    def metric(self, name, kind, help_text, samples):
+        name = self._name(name)
+        if not isinstance(samples, list):
+            samples = [({}, samples)]
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self._lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    def counter(self, name, help_text, samples):
+        self.metric(name, "counter", help_text, samples)
+
+    def gauge(self, name, help_text, samples):
+        self.metric(name, "gauge", help_text, samples)
+
+    def histograms(self, name, help_text, histograms, label="stage"):
+        # histograms: {label value: LatencyHistogram}; bucket bounds are converted from ms to seconds
+        name = self._name(name)
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} histogram")
+        for key, histogram in histograms.items():
+            counts, sum_ms = histogram.snapshot()
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, counts):
+                cumulative += count
+                labels = _format_labels({label: key, 'le': repr(bound / 1000.0)})
+                self._lines.append(f"{name}_bucket{labels} {cumulative}")
+            cumulative += counts[-1]
+            self._lines.append(f"{name}_bucket{_format_labels({label: key, 'le': '+Inf'})} {cumulative}")
+            self._lines.append(f"{name}_sum{_format_labels({label: key})} {repr(sum_ms / 1000.0)}")
+            self._lines.append(f"{name}_count{_format_labels({label: key})} {cumulative}")
+
+    def render(self):
+        return "\n".join(self._lines) + "\n"
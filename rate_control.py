@@ -0,0 +1,138 @@
+import collections
+import threading
+import time
+
+
+class AdaptiveRateController:
+    # Decides which captured frames go to the model. The per-source inference rate is the smaller of
+    #   - the measured source fps,
+    #   - a fair share of what the accelerator can sustain (from the rolling average service time),
+    #   - an AIMD rate that backs off whenever capture->result latency exceeds the budget.
+    def __init__(self, latency_budget_ms=250, min_fps=1.0, max_fps=None, window=30,
+                 headroom=0.9, update_interval=0.5):
+        self.latency_budget = latency_budget_ms / 1000.0
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+        self.headroom = headroom
+        self.update_interval = update_interval
+
+        self._lock = threading.Lock()
+        self._service_times = collections.deque(maxlen=window)
+        self._latencies = collections.deque(maxlen=window)
+        self._last_done = None
+        self._sources = {}
+        self._next_update = 0.0
+
+        self.target_fps = max_fps or 30.0
+        self.capacity_fps = None
+        self.admitted = 0
+        self.skipped = 0
+
+    def _source(self, source_id):
+        state = self._sources.get(source_id)
+        if state is None:
+            state = self._sources[source_id] = {
+                'last_seq': None, 'last_ts': None, 'source_fps': None,
+                'last_admit': None, 'admitted': 0, 'skipped': 0, 'last_seen': 0.0,
+            }
+        return state
+
+    def admit(self, packet):
+        now = time.monotonic()
+        with self._lock:
+            state = self._source(packet.source_id)
+            state['last_seen'] = now
+
+            # Source fps from sequence numbers, so frames dropped by the latest-frame buffer still count
+            if state['last_ts'] is not None and packet.seq > state['last_seq']:
+                dt = packet.capture_ts - state['last_ts']
+                if dt > 0:
+                    fps = (packet.seq - state['last_seq']) / dt
+                    prev = state['source_fps']
+                    state['source_fps'] = fps if prev is None else prev * 0.9 + fps * 0.1
+            state['last_seq'] = packet.seq
+            state['last_ts'] = packet.capture_ts
+
+            rate = self._source_rate(state)
+            interval = 1.0 / rate if rate > 0 else 0.0
+            # Half a source frame of slack so a 15 fps target on a 15 fps camera admits every frame
+            slack = 0.5 / state['source_fps'] if state['source_fps'] else 0.0
+            if state['last_admit'] is None or packet.capture_ts - state['last_admit'] >= interval - slack:
+                state['last_admit'] = packet.capture_ts
+                state['admitted'] += 1
+                self.admitted += 1
+                return True
+
+            state['skipped'] += 1
+            self.skipped += 1
+            return False
+
+    def record_inference(self, submit_ts, done_ts, capture_ts):
+        with self._lock:
+            # Service time is the accelerator time attributable to this frame, excluding time it waited
+            # behind earlier frames in the batch pipeline
+            start = submit_ts if self._last_done is None else max(submit_ts, self._last_done)
+            self._service_times.append(max(done_ts - start, 0.0))
+            self._last_done = done_ts
+            self._latencies.append(done_ts - capture_ts)
+
+            if done_ts >= self._next_update:
+                self._next_update = done_ts + self.update_interval
+                self._update(done_ts)
+
+    def _active_sources(self, now):
+        return [s for s in self._sources.values() if now - s['last_seen'] < 5.0] or list(self._sources.values())
+
+    def _update(self, now):
+        if not self._service_times:
+            return
+        avg_service = sum(self._service_times) / len(self._service_times)
+        avg_latency = sum(self._latencies) / len(self._latencies)
+        active = max(len(self._active_sources(now)), 1)
+
+        self.capacity_fps = self.headroom / avg_service if avg_service > 0 else None
+        share = self.capacity_fps / active if self.capacity_fps else self.target_fps
+
+        if avg_latency > self.latency_budget:
+            rate = self.target_fps * 0.8
+        elif avg_latency < self.latency_budget * 0.8:
+            rate = self.target_fps + 0.5
+        else:
+            rate = self.target_fps
+
+        upper = share
+        if self.max_fps:
+            upper = min(upper, self.max_fps)
+        fastest_source = max((s['source_fps'] or 0) for s in self._sources.values()) if self._sources else 0
+        if fastest_source:
+            upper = min(upper, fastest_source)
+        self.target_fps = max(self.min_fps, min(rate, upper))
+
+    def _source_rate(self, state):
+        rate = self.target_fps
+        if state['source_fps']:
+            rate = min(rate, state['source_fps'])
+        return rate
+
+    def stats(self):
+        with self._lock:
+            avg_service = sum(self._service_times) / len(self._service_times) if self._service_times else 0
+            avg_latency = sum(self._latencies) / len(self._latencies) if self._latencies else 0
+            return {
+                'target_fps': round(self.target_fps, 2),
+                'capacity_fps': round(self.capacity_fps, 1) if self.capacity_fps else None,
+                'avg_inference_ms': round(avg_service * 1000, 1),
+                'avg_latency_ms': round(avg_latency * 1000, 1),
+                'latency_budget_ms': round(self.latency_budget * 1000, 1),
+                'admitted': self.admitted,
+                'skipped': self.skipped,
+                'sources': {
+                    source_id: {
+                        'source_fps': round(s['source_fps'], 1) if s['source_fps'] else None,
+                        'infer_fps': round(self._source_rate(s), 2),
+                        'admitted': s['admitted'],
+                        'skipped': s['skipped'],
+                    }
+                    for source_id, s in self._sources.items()
+                },
+            }
@@ -0,0 +1,434 @@
+import asyncio
+import collections
+import contextlib
+import json
+import threading
+import time
+
+import cv2
+
+from encoders import make_encoder
+from metrics import stage_metrics
+from tracing import tracer
+
+
+# Named renditions selectable with ?profile=; size None keeps the display frame as-is
+DEFAULT_PROFILES = {
+    'full': {'size': None, 'quality': 75},
+    'medium': {'size': (640, 360), 'quality': 70},
+    'thumb': {'size': (320, 180), 'quality': 60},
+}
+
+
+class AsyncWaiters:
+    # Futures of coroutines waiting on state guarded by a threading.Condition. The producer thread calls
+    # wake() with the condition held; that schedules one callback per event loop, not one per waiter.
+    def __init__(self):
+        self._waiters = {}
+
+    def add(self, loop):
+        future = loop.create_future()
+        self._waiters.setdefault(loop, []).append(future)
+        return future
+
+    def discard(self, loop, future):
+        futures = self._waiters.get(loop)
+        if futures and future in futures:
+            futures.remove(future)
+
+    def wake(self):
+        if not self._waiters:
+            return
+        waiters, self._waiters = self._waiters, {}
+        for loop, futures in waiters.items():
+            try:
+                loop.call_soon_threadsafe(_resolve_all, futures)
+            except RuntimeError:
+                pass  # loop already closed
+
+
+def _resolve_all(futures):
+    for future in futures:
+        if not future.done():
+            future.set_result(None)
+
+
+async def _wait_async(cond, waiters, ready, timeout):
+    # Coroutine twin of cond.wait_for(ready, timeout): returns ready()'s result under the lock, or None on timeout
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    while True:
+        with cond:
+            result = ready()
+            if result is not None:
+                return result
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                return None
+            future = waiters.add(loop)
+        try:
+            await asyncio.wait_for(future, remaining)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with cond:
+                waiters.discard(loop, future)
+
+
+class Rendition:
+    def __init__(self, name, size=None, quality=75, encoder="opencv-baseline", subsampling='420', optimize=False):
+        self.name = name
+        self.size = tuple(size) if size else None
+        self.quality = quality
+        self.encoder = make_encoder(encoder, quality, subsampling=subsampling, optimize=optimize)
+        self.jpeg = None
+        self.frame_info = (None, None)  # (seq, capture_ts) of the frame in self.jpeg
+        self.version = 0
+        self.subscribers = 0
+        self.encodes = 0
+        self.deliveries = 0
+        self.cache_hits = 0  # deliveries of bytes another viewer already received
+        self.delivered_version = 0
+        self.encode_time = 0.0
+        self.discarded = 0  # encodes thrown away because the source frame changed underneath them
+
+    def stats(self):
+        return {
+            'subscribers': self.subscribers,
+            'encodes': self.encodes,
+            'deliveries': self.deliveries,
+            'cache_hits': self.cache_hits,
+            'discarded': self.discarded,
+            'avg_encode_ms': round(self.encode_time / self.encodes * 1000, 2) if self.encodes else 0,
+            'bytes': len(self.jpeg) if self.jpeg else 0,
+            'encoder': self.encoder.name,
+        }
+
+
+class JpegBroadcaster:
+    # Encodes each new frame once per rendition, on its own thread, and only for renditions someone
+    # is watching. Every viewer of a rendition gets the same cached bytes; the publisher only swaps a reference.
+    def __init__(self, name="jpeg", profiles=None, encoder="opencv-baseline"):
+        self.name = name
+        self.renditions = {
+            profile: Rendition(profile, **dict({'encoder': encoder}, **options))
+            for profile, options in (profiles or DEFAULT_PROFILES).items()
+        }
+        self.default_profile = next(iter(self.renditions))
+        self._cond = threading.Condition()
+        self._frame = None
+        self._frame_info = (None, None)
+        self._frame_valid = None
+        self._frame_version = 0
+        self._thread = None
+        self._async_waiters = AsyncWaiters()
+
+    def start(self, stop_event):
+        self._thread = threading.Thread(target=self._run, args=(stop_event,), name=f"encode-{self.name}", daemon=True)
+        self._thread.start()
+
+    def publish(self, frame, seq=None, capture_ts=None, is_valid=None):
+        # seq / capture_ts (time.monotonic() at capture) travel with the encoded bytes for latency tracing.
+        # is_valid is for frames that are views onto reusable memory (a FrameRing slot): an encode is
+        # discarded if it returns false afterwards, since the writer may have overwritten the frame mid-encode.
+        with self._cond:
+            self._frame = frame
+            self._frame_info = (seq, capture_ts)
+            self._frame_valid = is_valid
+            self._frame_version += 1
+            self._cond.notify_all()
+
+    def rendition(self, profile=None):
+        return self.renditions.get(profile or self.default_profile)
+
+    @contextlib.contextmanager
+    def subscribe(self, profile=None):
+        rendition = self.rendition(profile)
+        if rendition is None:
+            raise KeyError(f"Unknown stream profile: {profile}")
+        with self._cond:
+            rendition.subscribers += 1
+            self._cond.notify_all()
+        try:
+            yield rendition
+        finally:
+            with self._cond:
+                rendition.subscribers -= 1
+
+    @property
+    def subscribers(self):
+        return sum(r.subscribers for r in self.renditions.values())
+
+    def wait_for_jpeg(self, last_version, timeout=None, profile=None):
+        # Returns (version, bytes, (seq, capture_ts)) for the first JPEG newer than last_version,
+        # or (last_version, None, None) on timeout
+        rendition = self.rendition(profile)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while rendition.jpeg is None or rendition.version <= last_version:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return last_version, None, None
+                self._cond.wait(remaining)
+            return self._deliver(rendition)
+
+    async def wait_for_jpeg_async(self, last_version, timeout=None, profile=None):
+        # Same as wait_for_jpeg() for asyncio viewers: the coroutine parks on a future the encoder resolves
+        rendition = self.rendition(profile)
+
+        def ready():
+            if rendition.jpeg is not None and rendition.version > last_version:
+                return self._deliver(rendition)
+            return None
+
+        result = await _wait_async(self._cond, self._async_waiters, ready, timeout)
+        return result if result is not None else (last_version, None, None)
+
+    def _deliver(self, rendition):
+        # Called with the condition held
+        rendition.deliveries += 1
+        if rendition.delivered_version == rendition.version:
+            rendition.cache_hits += 1
+        rendition.delivered_version = rendition.version
+        return rendition.version, rendition.jpeg, rendition.frame_info
+
+    def _pending(self):
+        return [r for r in self.renditions.values() if r.subscribers > 0 and r.version < self._frame_version]
+
+    def _run(self, stop_event):
+        while not stop_event.is_set():
+            with self._cond:
+                while not stop_event.is_set() and (self._frame is None or not self._pending()):
+                    self._cond.wait(0.5)
+                if stop_event.is_set():
+                    break
+                frame = self._frame
+                frame_info = self._frame_info
+                is_valid = self._frame_valid
+                version = self._frame_version
+                pending = self._pending()
+
+            for rendition in pending:
+                start = time.perf_counter()
+                image = frame
+                if rendition.size and (frame.shape[1], frame.shape[0]) != rendition.size:
+                    image = cv2.resize(frame, rendition.size, interpolation=cv2.INTER_AREA)
+                try:
+                    jpeg = rendition.encoder.encode(image)
+                except Exception as e:
+                    print(f"Error encoding {self.name}/{rendition.name}: {e}")
+                    jpeg = None
+                if jpeg is not None and is_valid is not None and not is_valid():
+                    rendition.discarded += 1
+                    jpeg = None
+                elapsed = time.perf_counter() - start
+                stage_metrics.record("encode", elapsed)
+                tracer.span("encode", frame_info[0], self.name, elapsed, profile=rendition.name)
+
+                with self._cond:
+                    if jpeg is not None:
+                        rendition.jpeg = jpeg
+                        rendition.frame_info = frame_info
+                        rendition.encodes += 1
+                        rendition.encode_time += elapsed
+                    # Mark the version handled even on failure so a bad frame isn't retried forever
+                    rendition.version = version
+                    self._cond.notify_all()
+                    self._async_waiters.wake()
+
+    def stats(self):
+        with self._cond:
+            return {profile: r.stats() for profile, r in self.renditions.items()}
+
+
+class StreamClient:
+    # Per-connection pacing and delivery bookkeeping for one /video_feed viewer
+    def __init__(self, client_id, camera_id, target_fps, remote_addr=None, profile=None):
+        self.client_id = client_id
+        self.camera_id = camera_id
+        self.profile = profile
+        self.target_fps = target_fps
+        self.remote_addr = remote_addr
+        self.connected_at = time.monotonic()
+        self.delivered = 0
+        self.skipped = 0   # frames passed over to hold the client's target fps
+        self.dropped = 0   # frames lost because the client was still writing the previous one
+        self.bytes_sent = 0
+        self.behind_since = None
+        self.writing_since = None  # start of a write still in progress
+        self.disconnect_reason = None
+
+    @property
+    def frame_interval(self):
+        return 1.0 / self.target_fps
+
+    def record_gap(self, gap, was_slow):
+        if gap <= 0:
+            return
+        if was_slow:
+            self.dropped += gap
+        else:
+            self.skipped += gap
+
+    def begin_write(self, now):
+        self.writing_since = now
+
+    def record_write(self, size, write_time, now):
+        self.writing_since = None
+        self.delivered += 1
+        self.bytes_sent += size
+        slow = write_time > self.frame_interval
+        if slow:
+            if self.behind_since is None:
+                self.behind_since = now - write_time
+        else:
+            self.behind_since = None
+        return slow
+
+    def behind_for(self, now):
+        # A write that is still blocked counts as falling behind once it has taken longer than a frame
+        since = self.behind_since
+        if self.writing_since is not None and now - self.writing_since > self.frame_interval:
+            since = self.writing_since if since is None else min(since, self.writing_since)
+        return now - since if since is not None else 0.0
+
+    def stats(self):
+        elapsed = time.monotonic() - self.connected_at
+        return {
+            'id': self.client_id,
+            'camera': self.camera_id,
+            'profile': self.profile,
+            'remote_addr': self.remote_addr,
+            'target_fps': self.target_fps,
+            'delivered_fps': round(self.delivered / elapsed, 1) if elapsed > 0 else 0,
+            'delivered': self.delivered,
+            'skipped': self.skipped,
+            'dropped': self.dropped,
+            'bytes_sent': self.bytes_sent,
+            'behind_s': round(self.behind_for(time.monotonic()), 1),
+        }
+
+
+class ClientRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._next_id = 0
+        self.disconnected_slow = 0
+        self._closed_bytes_sent = 0  # bytes written to viewers that have since left
+
+    def add(self, camera_id, target_fps, remote_addr=None, profile=None):
+        with self._lock:
+            self._next_id += 1
+            client = StreamClient(self._next_id, camera_id, target_fps, remote_addr, profile)
+            self._clients[client.client_id] = client
+            return client
+
+    def remove(self, client):
+        with self._lock:
+            if self._clients.pop(client.client_id, None) is not None:
+                self._closed_bytes_sent += client.bytes_sent
+            if client.disconnect_reason == "slow":
+                self.disconnected_slow += 1
+
+    def __len__(self):
+        return len(self._clients)
+
+    def bytes_sent(self):
+        # Running total over every viewer so far, so it only ever grows
+        with self._lock:
+            return self._closed_bytes_sent + sum(client.bytes_sent for client in self._clients.values())
+
+    def stats(self):
+        with self._lock:
+            clients = list(self._clients.values())
+        return [client.stats() for client in clients]
+
+
+class ServerSentEvent:
+    __slots__ = ('version', 'event', 'payload', 'event_id', '_encoded')
+
+    def __init__(self, version, event, payload, event_id=None):
+        self.version = version
+        self.event = event
+        self.payload = payload
+        self.event_id = event_id
+        self._encoded = None
+
+    def encode(self):
+        # Serialized on first read and cached, so N subscribers cost one json.dumps
+        if self._encoded is None:
+            head = f"event: {self.event}\n"
+            if self.event_id is not None:
+                head += f"id: {self.event_id}\n"
+            self._encoded = (head + "data: " + json.dumps(self.payload, separators=(',', ':')) + "\n\n").encode('utf-8')
+        return self._encoded
+
+
+class EventBroadcaster:
+    # Small ring of recent events; each subscriber walks it by version so it sees every event once,
+    # and a subscriber that falls further behind than the ring skips ahead instead of buffering
+    def __init__(self, history=32):
+        self._cond = threading.Condition()
+        self._events = collections.deque(maxlen=history)
+        self._version = 0
+        self._subscribers = 0
+        self.published = 0
+        self._async_waiters = AsyncWaiters()
+
+    def publish(self, event, payload, event_id=None):
+        with self._cond:
+            self._version += 1
+            self._events.append(ServerSentEvent(self._version, event, payload, event_id))
+            self.published += 1
+            self._cond.notify_all()
+            self._async_waiters.wake()
+
+    @contextlib.contextmanager
+    def subscribe(self):
+        with self._cond:
+            self._subscribers += 1
+        try:
+            yield self
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+
+    @property
+    def subscribers(self):
+        return self._subscribers
+
+    def latest_version(self):
+        return self._version
+
+    def version_for_event_id(self, event_id):
+        # Resume point for a reconnecting EventSource (Last-Event-ID), if it is still in the ring
+        with self._cond:
+            for ev in self._events:
+                if ev.event_id is not None and str(ev.event_id) == str(event_id):
+                    return ev.version
+        return None
+
+    def wait_for_events(self, last_version, timeout=None):
+        # Returns (version, [events newer than last_version]); empty list on timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._version <= last_version:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return last_version, []
+                self._cond.wait(remaining)
+            events = [ev for ev in self._events if ev.version > last_version]
+            return self._version, events
+
+    async def wait_for_events_async(self, last_version, timeout=None):
+        def ready():
+            if self._version > last_version:
+                return self._version, [ev for ev in self._events if ev.version > last_version]
+            return None
+
+        result = await _wait_async(self._cond, self._async_waiters, ready, timeout)
+        return result if result is not None else (last_version, [])
+
+    def stats(self):
+        return {'subscribers': self._subscribers, 'published': self.published}
@@ -1,6 +1,7 @@
 
 import subprocess
 import degirum as dg
+from backends import DegirumBackend
 import sys
 import cv2
 
@@ -57,13 +58,13 @@ if __name__ == "__main__":
         model_name = "yolov8n_relu6_coco--640x640_quant_hailort_hailo8l_1"
 
         try:
-            model = dg.load_model(
+            model = DegirumBackend(
                 model_name=model_name,
                 inference_host_address=inference_host_address,
                 zoo_url=zoo_url,
                 token=token,
                 device_type=device_type,
-            )
+            ).load()
         except Exception as e:
             print(f"Error loading model '{model_name}': {e}")
             sys.exit(1)
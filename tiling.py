@@ -0,0 +1,160 @@
+import math
+
+import numpy as np
+
+from letterbox import letterbox_for
+
+
+def nms(boxes, scores, labels, iou_threshold=0.5, contain_threshold=0.8):
+    # Class-aware greedy NMS over (N, 4) x1,y1,x2,y2 boxes; returns kept indices, best score first.
+    # A box is also suppressed when most of it lies inside a better one (intersection over its own
+    # area), which removes the partial boxes an object cut by a tile edge leaves behind.
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    order = np.argsort(-np.asarray(scores, dtype=np.float32), kind='stable')
+    b = boxes[order]
+    _, classes = np.unique(np.asarray(labels, dtype=object)[order].astype(str), return_inverse=True)
+
+    area = np.clip(b[:, 2] - b[:, 0], 0, None) * np.clip(b[:, 3] - b[:, 1], 0, None)
+    iw = np.clip(np.minimum(b[:, None, 2], b[None, :, 2]) - np.maximum(b[:, None, 0], b[None, :, 0]), 0, None)
+    ih = np.clip(np.minimum(b[:, None, 3], b[None, :, 3]) - np.maximum(b[:, None, 1], b[None, :, 1]), 0, None)
+    inter = iw * ih
+    iou = inter / np.maximum(area[:, None] + area[None, :] - inter, 1e-6)
+    inside = inter / np.maximum(area[None, :], 1e-6)  # [i, j]: share of box j covered by box i
+    overlaps = ((iou > iou_threshold) | (inside > contain_threshold)) & (classes[:, None] == classes[None, :])
+
+    # The pairwise work is done above; this walk only reads one precomputed row per kept box
+    keep = np.ones(len(b), dtype=bool)
+    for i in range(len(b)):
+        if keep[i]:
+            keep[i + 1:] &= ~overlaps[i, i + 1:]
+    return order[keep]
+
+
+def _positions(length, tile, overlap):
+    # Tile origins along one axis, spread evenly so neighbours overlap by at least `overlap` of a tile
+    if length <= tile:
+        return [0]
+    step = tile * (1 - overlap)
+    count = int(math.ceil((length - tile) / step)) + 1
+    return [round(i * (length - tile) / (count - 1)) for i in range(count)]
+
+
+class TiledResult:
+    # Merged detections for one frame, shaped like a backend result (.results, .info)
+    __slots__ = ('results', 'info')
+
+    def __init__(self, results, info=None):
+        self.results = results
+        self.info = info
+
+    def __str__(self):
+        return "\n".join(f"- {r['label']}: {r['score']:.2f} {r['bbox']}" for r in self.results) or "(no detections)"
+
+
+class TilePlan:
+    # One frame's windows and the results collected for them. Window i maps model boxes to native frame
+    # pixels as box * (sx, sy) + (x, y).
+    __slots__ = ('layout', 'windows', 'frame_size', 'model_size', 'results', 'pending')
+
+    def __init__(self, layout, windows, frame_size, model_size):
+        self.layout = layout
+        self.windows = windows
+        self.frame_size = frame_size
+        self.model_size = model_size
+        self.results = [None] * len(windows)
+        self.pending = len(windows)
+
+    def add(self, index, result):
+        # True once every window has its result
+        self.results[index] = result
+        self.pending -= 1
+        return self.pending == 0
+
+    def merge(self, info=None):
+        # Detections from all windows in native pixels, de-duplicated, then expressed in the whole frame's
+        # letterboxed model space so downstream code treats them exactly like an untiled result
+        detections, boxes, origin = [], [], []
+        for index, result in enumerate(self.results):
+            for det in result.results:
+                detections.append(det)
+                boxes.append(det['bbox'])
+                origin.append(index)
+        if not detections:
+            return TiledResult([], info)
+
+        windows = self.windows[origin]
+        native = np.asarray(boxes, dtype=np.float32).reshape(-1, 4) * windows[:, [2, 3, 2, 3]] + windows[:, [0, 1, 0, 1]]
+        keep = nms(native, [d['score'] for d in detections], [d['label'] for d in detections],
+                   self.layout.nms_iou, self.layout.nms_contain)
+
+        merged = letterbox_for(self.frame_size, self.model_size).to_model(native[keep])
+        return TiledResult([dict(detections[i], bbox=[float(v) for v in box]) for i, box in zip(keep, merged)], info)
+
+
+class TileLayout:
+    # How one camera's frames are cut up for the model: overlapping model-sized tiles at native resolution
+    # (an explicit grid=(cols, rows), or as many as `overlap` needs), plus an optional global view of
+    # the whole frame letterboxed to model size for objects larger than a tile.
+    def __init__(self, tile_size=(640, 640), overlap=0.2, grid=None, global_view=True,
+                 nms_iou=0.5, nms_contain=0.8):
+        self.tile_size = tuple(tile_size)
+        self.overlap = overlap
+        self.grid = tuple(grid) if grid else None
+        self.global_view = global_view
+        self.nms_iou = nms_iou
+        self.nms_contain = nms_contain
+        self._windows = {}
+        self._last_size = None
+        self.frames = 0
+
+    def windows(self, frame_w, frame_h):
+        # (N, 4) float32 [x, y, sx, sy] per window, tiles first then the global view; cached per frame size
+        windows = self._windows.get((frame_w, frame_h))
+        if windows is None:
+            tile_w, tile_h = self.tile_size
+            if self.grid:
+                cols, rows = self.grid
+                xs = [round(i * max(frame_w - tile_w, 0) / max(cols - 1, 1)) for i in range(cols)]
+                ys = [round(i * max(frame_h - tile_h, 0) / max(rows - 1, 1)) for i in range(rows)]
+            else:
+                xs = _positions(frame_w, tile_w, self.overlap)
+                ys = _positions(frame_h, tile_h, self.overlap)
+            rows = [[x, y, 1.0, 1.0] for y in ys for x in xs]
+            if self.global_view and len(rows) > 1:
+                letterbox = letterbox_for((frame_w, frame_h), self.tile_size)
+                pad_x, pad_y = letterbox.pad
+                scale = letterbox.scale
+                rows.append([-pad_x / scale, -pad_y / scale, 1 / scale, 1 / scale])
+            windows = self._windows[(frame_w, frame_h)] = np.array(rows, dtype=np.float32)
+        return windows
+
+    def plan(self, frame, model_size):
+        # Returns (model inputs, TilePlan). Tiles are slices of the frame, not copies; only the global
+        # view is resized.
+        frame_h, frame_w = frame.shape[:2]
+        windows = self.windows(frame_w, frame_h)
+        self._last_size = (frame_w, frame_h)
+        self.frames += 1
+        tile_w, tile_h = self.tile_size
+        inputs = []
+        for x, y, sx, sy in windows:
+            if sx == 1.0 and sy == 1.0:
+                x, y = int(x), int(y)
+                inputs.append(frame[y:y + tile_h, x:x + tile_w])
+            else:
+                inputs.append(letterbox_for((frame_w, frame_h), self.tile_size).apply(frame))
+        return inputs, TilePlan(self, windows, (frame_w, frame_h), model_size)
+
+    def stats(self):
+        windows = self._windows.get(self._last_size, np.zeros((0, 4), dtype=np.float32))
+        return {
+            'frames': self.frames,
+            'frame_size': list(self._last_size) if self._last_size else None,
+            'tiles': int(np.count_nonzero((windows[:, 2] == 1.0) & (windows[:, 3] == 1.0))),
+            'global_view': bool(self.global_view and len(windows) > 1),
+            'tile_size': list(self.tile_size),
+            'overlap': self.overlap,
+            'grid': list(self.grid) if self.grid else None,
+        }
@@ -0,0 +1,65 @@
+import collections
+import json
+import os
+import threading
+import time
+
+
+class FrameTracer:
+    # Sampled per-frame spans in Chrome trace format (load the dump in chrome://tracing or Perfetto).
+    # Only frames whose seq is a multiple of sample_every are kept, in a bounded ring, so leaving it
+    # on under load costs one modulo per stage for unsampled frames.
+    def __init__(self, sample_every=0, max_events=20000):
+        self.sample_every = int(sample_every)
+        self._events = collections.deque(maxlen=max(1, int(max_events)))
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.sample_every > 0
+
+    def configure(self, sample_every, max_events=None):
+        with self._lock:
+            self.sample_every = int(sample_every)
+            if max_events is not None:
+                self._events = collections.deque(self._events, maxlen=max(1, int(max_events)))
+
+    def sampled(self, seq):
+        return self.sample_every > 0 and seq is not None and seq % self.sample_every == 0
+
+    def span(self, name, seq, camera, duration, end=None, **args):
+        # duration in seconds, end a time.monotonic() value (defaults to now)
+        if not self.sampled(seq):
+            return
+        end = time.monotonic() if end is None else end
+        thread = threading.current_thread()
+        args.update(seq=seq, camera=camera)
+        with self._lock:
+            tid = self._threads.setdefault(thread.name, len(self._threads) + 1)
+            self._events.append({
+                'name': name, 'cat': camera or 'frame', 'ph': 'X',
+                'ts': round((end - duration) * 1e6, 1), 'dur': round(duration * 1e6, 1),
+                'pid': os.getpid(), 'tid': tid, 'args': args,
+            })
+
+    def trace(self):
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        pid = os.getpid()
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                    for name, tid in threads.items()]
+        return {'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.trace(), f)
+        return path
+
+    def stats(self):
+        return {'sample_every': self.sample_every, 'events': len(self._events), 'max_events': self._events.maxlen}
+
+
+# Off until the server configures a sample rate
+tracer = FrameTracer()
@@ -0,0 +1,210 @@
+import numpy as np
+
+from delta_filter import iou_matrix
+
+# Kalman state per track: box centre, size, and their velocities in pixels per second
+STATE_DIM = 8
+MEASURE_DIM = 4
+
+
+def _to_measurement(boxes):
+    # x1,y1,x2,y2 -> cx,cy,w,h
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    size = boxes[:, 2:] - boxes[:, :2]
+    return np.hstack([boxes[:, :2] + size / 2, size])
+
+
+def _to_boxes(state):
+    centre, size = state[:, :2], np.maximum(state[:, 2:4], 1.0)
+    return np.hstack([centre - size / 2, centre + size / 2])
+
+
+def _greedy_match(ious, threshold):
+    # Highest-IoU pairs first; good enough for the tens of objects per frame we see, and no scipy
+    pairs = []
+    if ious.size == 0:
+        return pairs
+    used_rows, used_cols = set(), set()
+    for flat in np.argsort(-ious, axis=None):
+        row, col = divmod(int(flat), ious.shape[1])
+        if ious[row, col] < threshold:
+            break
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        pairs.append((row, col))
+    return pairs
+
+
+class Tracker:
+    # SORT-style multi-object tracker with ByteTrack's second pass: a constant-velocity Kalman filter per
+    # track, stepped by capture time so inferred frames can be any distance apart, and greedy IoU matching
+    # within a label. High-score detections are matched first and may start tracks; low-score ones only
+    # keep existing tracks alive. predict() gives box positions for frames that skipped the model.
+    # All tracks are filtered together as (N, 8) / (N, 8, 8) arrays.
+    def __init__(self, iou_threshold=0.3, low_iou_threshold=0.3, high_score=0.5, min_hits=1, max_age=1.0,
+                 position_noise=0.05, velocity_noise=0.2, measurement_noise=0.05):
+        self.iou_threshold = iou_threshold
+        self.low_iou_threshold = low_iou_threshold
+        self.high_score = high_score
+        self.min_hits = max(1, int(min_hits))
+        self.max_age = max_age
+        self.position_noise = position_noise
+        self.velocity_noise = velocity_noise
+        self.measurement_noise = measurement_noise
+
+        self._x = np.zeros((0, STATE_DIM))
+        self._P = np.zeros((0, STATE_DIM, STATE_DIM))
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._hits = np.zeros(0, dtype=np.int64)
+        self._misses = np.zeros(0, dtype=np.int64)
+        self._last_update = np.zeros(0)
+        self._labels = []
+        self._scores = np.zeros(0)
+        self._time = None
+        self._next_id = 1
+
+        self.updates = 0
+        self.predictions = 0
+        self.tracks_started = 0
+
+    def _advance(self, now):
+        # Predict every track forward to `now` (a time.monotonic() capture time)
+        dt = 0.0 if self._time is None else max(0.0, now - self._time)
+        self._time = now if self._time is None else max(self._time, now)
+        if dt == 0.0 or len(self._x) == 0:
+            return
+        F = np.eye(STATE_DIM)
+        F[:MEASURE_DIM, MEASURE_DIM:] = np.eye(MEASURE_DIM) * dt
+        height = np.maximum(self._x[:, 3], 1.0)
+        q = np.empty((len(self._x), STATE_DIM))
+        q[:, :MEASURE_DIM] = (self.position_noise * height)[:, None] ** 2
+        q[:, MEASURE_DIM:] = (self.velocity_noise * height)[:, None] ** 2
+        self._x = self._x @ F.T
+        self._P = F @ self._P @ F.T + q[:, :, None] * np.eye(STATE_DIM) * dt
+
+    def _correct(self, index, measurements):
+        # Kalman update for the tracks in `index` against their matched (K, 4) measurements
+        x, P = self._x[index], self._P[index]
+        r = (self.measurement_noise * np.maximum(measurements[:, 3], 1.0)) ** 2
+        S = P[:, :MEASURE_DIM, :MEASURE_DIM] + r[:, None, None] * np.eye(MEASURE_DIM)
+        K = P[:, :, :MEASURE_DIM] @ np.linalg.inv(S)
+        residual = measurements - x[:, :MEASURE_DIM]
+        self._x[index] = x + (K @ residual[:, :, None])[:, :, 0]
+        self._P[index] = P - K @ P[:, :MEASURE_DIM, :]
+
+    def _start(self, detections, measurements):
+        count = len(detections)
+        x = np.zeros((count, STATE_DIM))
+        x[:, :MEASURE_DIM] = measurements
+        height = np.maximum(measurements[:, 3], 1.0)
+        variance = np.empty((count, STATE_DIM))
+        variance[:, :MEASURE_DIM] = (2 * self.position_noise * height)[:, None] ** 2
+        variance[:, MEASURE_DIM:] = (10 * self.velocity_noise * height)[:, None] ** 2
+        self._x = np.vstack([self._x, x])
+        self._P = np.concatenate([self._P, variance[:, :, None] * np.eye(STATE_DIM)])
+        self._ids = np.concatenate([self._ids, np.arange(self._next_id, self._next_id + count)])
+        self._hits = np.concatenate([self._hits, np.ones(count, dtype=np.int64)])
+        self._misses = np.concatenate([self._misses, np.zeros(count, dtype=np.int64)])
+        self._last_update = np.concatenate([self._last_update, np.full(count, self._time)])
+        self._labels += [d['label'] for d in detections]
+        self._scores = np.concatenate([self._scores, [d['score'] for d in detections]])
+        self._next_id += count
+        self.tracks_started += count
+
+    def _match(self, tracks, detections, boxes, labels, threshold):
+        # Greedy IoU matching between track and detection index lists, only within the same label
+        if not tracks or not detections:
+            return []
+        ious = iou_matrix(_to_boxes(self._x[tracks]), boxes[detections])
+        track_labels = np.array([self._labels[t] for t in tracks], dtype=object)
+        ious[track_labels[:, None] != labels[detections][None, :]] = 0
+        return [(tracks[r], detections[c]) for r, c in _greedy_match(ious, threshold)]
+
+    def update(self, detections, now):
+        # detections from an inferred frame (display-space 'bbox' x1,y1,x2,y2); returns the confirmed
+        # tracks matched in it, as the same dicts with a 'track_id' added
+        self._advance(now)
+        self.updates += 1
+        boxes = np.asarray([d['bbox'] for d in detections], dtype=np.float64).reshape(-1, 4)
+        labels = np.array([d['label'] for d in detections], dtype=object)
+        high = [i for i, d in enumerate(detections) if d['score'] >= self.high_score]
+        low = [i for i, d in enumerate(detections) if d['score'] < self.high_score]
+
+        tracks = list(range(len(self._x)))
+        matches = self._match(tracks, high, boxes, labels, self.iou_threshold)
+        matched_tracks = {t for t, _ in matches}
+        remaining = [t for t in tracks if t not in matched_tracks and self._misses[t] == 0]
+        matches += self._match(remaining, low, boxes, labels, self.low_iou_threshold)
+
+        matched = np.zeros(len(self._x), dtype=bool)
+        assigned = {}
+        if matches:
+            index = np.array([t for t, _ in matches])
+            self._correct(index, _to_measurement(boxes[[d for _, d in matches]]))
+            matched[index] = True
+            self._hits[index] += 1
+            self._misses[index] = 0
+            self._last_update[index] = self._time
+            for t, d in matches:
+                self._scores[t] = detections[d]['score']
+                assigned[d] = t
+        self._misses[~matched] += 1
+
+        # Unmatched high-score detections start tracks; tracks unmatched for max_age seconds are dropped
+        fresh = [i for i in high if i not in assigned]
+        keep = self._time - self._last_update <= self.max_age
+        if not keep.all():
+            self._drop(keep)
+            assigned = self._reindex(assigned, keep)
+        if fresh:
+            first = len(self._x)
+            self._start([detections[i] for i in fresh], _to_measurement(boxes[fresh]))
+            assigned.update({d: first + n for n, d in enumerate(fresh)})
+
+        tracked = []
+        for d, t in sorted(assigned.items()):
+            if self._hits[t] >= self.min_hits:
+                tracked.append(dict(detections[d], track_id=int(self._ids[t])))
+        return tracked
+
+    def predict(self, now, timestamp=None):
+        # Boxes for a frame that skipped the model: every confirmed track matched on the last inferred
+        # frame, moved along its velocity to `now`
+        self._advance(now)
+        self.predictions += 1
+        live = np.flatnonzero((self._misses == 0) & (self._hits >= self.min_hits))
+        boxes = np.rint(_to_boxes(self._x[live])).astype(int) if len(live) else []
+        return [
+            {
+                'label': self._labels[t],
+                'score': float(self._scores[t]),
+                'bbox': [int(v) for v in box],
+                'timestamp': timestamp,
+                'track_id': int(self._ids[t]),
+                'predicted': True
+            }
+            for t, box in zip(live, boxes)
+        ]
+
+    def _drop(self, keep):
+        self._x, self._P = self._x[keep], self._P[keep]
+        self._ids, self._hits, self._misses = self._ids[keep], self._hits[keep], self._misses[keep]
+        self._last_update, self._scores = self._last_update[keep], self._scores[keep]
+        self._labels = [label for label, k in zip(self._labels, keep) if k]
+
+    @staticmethod
+    def _reindex(assigned, keep):
+        # Track indices shift after _drop(); matched tracks were just updated so they are always kept
+        new_index = np.cumsum(keep) - 1
+        return {d: int(new_index[t]) for d, t in assigned.items()}
+
+    def stats(self):
+        return {
+            'tracks': len(self._x),
+            'confirmed': int(np.count_nonzero(self._hits >= self.min_hits)),
+            'tracks_started': self.tracks_started,
+            'updates': self.updates,
+            'predictions': self.predictions,
+        }
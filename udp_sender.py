@@ -0,0 +1,95 @@
+import collections
+import json
+import socket
+import threading
+import time
+
+from metrics import stage_metrics
+from tracing import tracer
+
+
+class UdpSender(threading.Thread):
+    # One long-lived sender fed by a bounded queue. When the network stalls the oldest payloads are
+    # dropped; every datagram carries a sequence number so receivers can spot gaps and reordering.
+    def __init__(self, host, port, stop_event, maxsize=64, broadcast=True, encode=None):
+        super().__init__(name="udp-sender", daemon=True)
+        self.address = (host, port)
+        self.stop_event = stop_event
+        self.encode = encode or self._encode_json
+        self._queue = collections.deque(maxlen=max(1, int(maxsize)))
+        self._cond = threading.Condition()
+        self._seq = 0
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if broadcast:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+
+        self.submitted = 0
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+        self.bytes_sent = 0
+
+    @staticmethod
+    def _encode_json(message):
+        return [json.dumps(message).encode('utf-8')]
+
+    def submit(self, message, capture_ts=None):
+        # message is a dict; the sender stamps it with 'seq' in submission order.
+        # capture_ts (time.monotonic() at capture) is kept beside it for capture-to-send latency.
+        with self._cond:
+            self._seq += 1
+            message['seq'] = self._seq
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append((message, capture_ts))
+            self.submitted += 1
+            self._cond.notify()
+        return message['seq']
+
+    def queue_depth(self):
+        return len(self._queue)
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                with self._cond:
+                    while not self._queue and not self.stop_event.is_set():
+                        self._cond.wait(0.5)
+                    if not self._queue:
+                        continue
+                    message, capture_ts = self._queue.popleft()
+
+                start = time.perf_counter()
+                try:
+                    for datagram in self.encode(message):
+                        self.socket.sendto(datagram, self.address)
+                        self.bytes_sent += len(datagram)
+                    self.sent += 1
+                    elapsed = time.perf_counter() - start
+                    stage_metrics.record("udp_send", elapsed)
+                    if capture_ts is not None:
+                        sent_at = time.monotonic()
+                        stage_metrics.record("capture_to_udp", sent_at - capture_ts)
+                        tracer.span("udp_send", message.get('frame_seq'), message.get('camera'), elapsed, end=sent_at)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Error sending UDP data: {e}")
+        finally:
+            self.socket.close()
+
+    def stop(self):
+        self.stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def stats(self):
+        return {
+            'submitted': self.submitted,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'queue_depth': len(self._queue),
+            'queue_size': self._queue.maxlen,
+            'bytes_sent': self.bytes_sent,
+            'last_seq': self._seq,
+        }
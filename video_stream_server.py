@@ -1,16 +1,36 @@
 import subprocess
-import degirum as dg
 import sys
 import cv2
 import time
 import threading
 import json
-import socket
+import math
 import os
 import signal
-from flask import Flask, Response, jsonify, request, redirect, url_for, session, render_template_string, send_from_directory
+import asyncio
+import multiprocessing
+from quart import Quart, Response, jsonify, request, redirect, url_for, session, render_template_string, send_from_directory
+from hypercorn.asyncio import serve
+from hypercorn.config import Config as HypercornConfig
+from backends import make_backend
+from capture import ReconnectPolicy
+from cameras import build_registry, load_camera_sources
+from delta_filter import ChangeFilter
+from frame_ring import FrameRing, RingPublisher, RingSubscriber
+from metrics import process_stats, stage_metrics
+from motion_gate import MotionGate
+from overlay import draw_detections, scale_detections
+from prometheus import CONTENT_TYPE as PROMETHEUS_CONTENT_TYPE, MetricsWriter
+from tracing import tracer
+from tiling import TileLayout
+from tracker import Tracker
+from pipeline import RoundRobinScheduler, VideoPipeline
+from rate_control import AdaptiveRateController
+from streaming import DEFAULT_PROFILES, ClientRegistry
+from udp_sender import UdpSender
+from wire_format import WireEncoder
 
-app = Flask(__name__)
+app = Quart(__name__)
 app.secret_key = 'your_secret_key_here'
 
 # Authentication configuration
@@ -19,14 +39,12 @@ VALID_PASSWORD = "erlspectra"
 AUTH_REQUIRED = True
 
 # Global variables
-latest_frame = None
-latest_detections = []
 frame_lock = threading.Lock()
-last_frame_time = time.time()
 shutdown_flag = threading.Event()
 
 # Thread management
 running_threads = []
+pipeline = None
 
 # Performance monitoring
 performance_stats = {
@@ -34,12 +52,176 @@ performance_stats = {
     'inference_time': 0,
     'processing_time': 0
 }
+# The small fixed subset of performance_stats sent with every UDP detection message
+udp_stats = dict(performance_stats)
+# Prometheus page, re-rendered by monitor_performance so /metrics only returns a cached string
+metrics_page = ""
+
+# Video source: RTSP URL, local file path, or "synthetic" for the built-in frame generator
+VIDEO_SOURCE = os.environ.get("VIDEO_SOURCE", "rtsp://192.168.136.100:554/live/0")
+
+# Camera registry: CAMERA_SOURCES is a JSON file or "cam0=rtsp://...,cam1=rtsp://..."; defaults to VIDEO_SOURCE as cam0.
+# All cameras share one loaded model and are served round-robin.
+CAMERA_SOURCES = load_camera_sources(os.environ.get("CAMERA_SOURCES", ""), VIDEO_SOURCE)
+# MJPEG renditions selectable with /video_feed?profile=<name>; each is encoded only while it has viewers.
+# JPEG_ENCODER is "opencv-baseline", "opencv-progressive" or "turbojpeg"; a profile may override it
+# along with 'subsampling' ("420"/"422"/"444") and 'optimize'. See bench_encoders.py for the trade-offs.
+# The renditions are streaming.DEFAULT_PROFILES (full, medium, thumb), shared with bench_pipeline.py.
+JPEG_ENCODER = os.environ.get("JPEG_ENCODER", "opencv-baseline")
+STREAM_PROFILES = DEFAULT_PROFILES
+
+# Detection publishing: "full" sends every processed frame; "delta" only sends when objects appear,
+# disappear or move past the IoU/pixel thresholds for DELTA_HYSTERESIS_FRAMES frames, plus a
+# keyframe every DELTA_KEYFRAME_INTERVAL_S so late joiners can resync
+PUBLISH_MODE = os.environ.get("PUBLISH_MODE", "full")
+DELTA_IOU_THRESHOLD = 0.7
+DELTA_PIXEL_THRESHOLD = 20
+DELTA_HYSTERESIS_FRAMES = 2
+DELTA_KEYFRAME_INTERVAL_S = 5.0
+
+def make_change_filter():
+    return ChangeFilter(
+        iou_threshold=DELTA_IOU_THRESHOLD,
+        pixel_threshold=DELTA_PIXEL_THRESHOLD,
+        hysteresis_frames=DELTA_HYSTERESIS_FRAMES,
+        keyframe_interval=DELTA_KEYFRAME_INTERVAL_S
+    )
+
+# Tracking (TRACKING=on): each camera runs a SORT/ByteTrack-style tracker over its detections, so they
+# carry a stable track_id, and frames the rate controller or motion gate keep from the model are still
+# displayed and published with boxes predicted from the tracks. Inference can then run well below the
+# camera fps (see MAX_INFERENCE_FPS) without the overlay or UDP feed stuttering.
+TRACKING = os.environ.get("TRACKING", "off") == "on"
+TRACK_IOU_THRESHOLD = 0.3
+TRACK_HIGH_SCORE = 0.5
+TRACK_MIN_HITS = 1
+TRACK_MAX_AGE_S = 1.0
+
+def make_tracker():
+    return Tracker(
+        iou_threshold=TRACK_IOU_THRESHOLD,
+        high_score=TRACK_HIGH_SCORE,
+        min_hits=TRACK_MIN_HITS,
+        max_age=TRACK_MAX_AGE_S
+    )
+
+# Capture timeouts: opening a camera or reading one frame fails after this long instead of hanging, so
+# the capture thread notices a dead camera itself. Keep the read timeout below STALL_TIMEOUT_S.
+CAPTURE_OPEN_TIMEOUT_MS = 10000
+CAPTURE_READ_TIMEOUT_MS = 5000
+
+cameras = build_registry(
+    CAMERA_SOURCES,
+    open_timeout_ms=CAPTURE_OPEN_TIMEOUT_MS,
+    read_timeout_ms=CAPTURE_READ_TIMEOUT_MS,
+    stream_profiles=STREAM_PROFILES,
+    jpeg_encoder=JPEG_ENCODER,
+    change_filter=make_change_filter if PUBLISH_MODE == "delta" else None,
+    tracker=make_tracker if TRACKING else None
+)
+
+# Reconnect: a dropped or stalled camera is reopened with exponential backoff while the model and
+# web server stay up. STALL_TIMEOUT_S is how long a streaming camera may go without a frame.
+RECONNECT_INITIAL_DELAY_S = 0.5
+RECONNECT_MAX_DELAY_S = 30.0
+STALL_TIMEOUT_S = 10.0
+
+# Pipeline configuration: queue depth between stages and what to do when a stage falls behind
+# ("drop_oldest", "drop_newest" or "block")
+PIPELINE_QUEUE_DEPTH = 2
+PIPELINE_DROP_POLICY = "drop_oldest"
+PRINT_RESULTS = False
+
+# Adaptive inference rate: frames are admitted to the model at a rate derived from the measured
+# source fps and rolling inference time, backing off when capture->result latency exceeds the budget
+LATENCY_BUDGET_MS = 250
+MIN_INFERENCE_FPS = 1.0
+MAX_INFERENCE_FPS = None
+
+# Tiled inference: cameras listed in TILE_LAYOUTS are cut into overlapping model-sized tiles at native
+# resolution (plus an optional downscaled global view) instead of squashing the whole frame into one
+# 640x640 input, so small distant objects survive; tile results are merged with cross-tile NMS.
+# JSON keyed by camera id, each value TileLayout options, e.g.
+#   {"cam0": {"overlap": 0.2, "global_view": true}, "cam1": {"grid": [3, 2], "global_view": false}}
+# Every tile is a model call, so a 1080p frame costs 8 + 1 inferences; pair it with MAX_INFERENCE_FPS.
+TILE_LAYOUTS = json.loads(os.environ.get("TILE_LAYOUTS") or "{}")
+
+# Motion gating (MOTION_GATE=on): a camera's frame only goes to the model when a MOTION_GATE_SIZE grayscale
+# copy differs from its running background in more than MOTION_THRESHOLD of the pixels (by over
+# MOTION_PIXEL_DELTA grey levels), or MOTION_REFRESH_S has passed; otherwise the last detections carry forward
+MOTION_GATE = os.environ.get("MOTION_GATE", "off") == "on"
+MOTION_GATE_SIZE = (160, 90)
+MOTION_PIXEL_DELTA = 25
+MOTION_THRESHOLD = 0.005
+MOTION_BACKGROUND_RATE = 0.05
+MOTION_REFRESH_S = 10.0
+
+# MJPEG viewers: default and maximum per-client fps (?fps=N), and how long a client may stay behind
+# (including inside a single blocked write) before it is disconnected; checked every SLOW_CLIENT_CHECK_S
+DEFAULT_CLIENT_FPS = 15
+MAX_CLIENT_FPS = 30
+SLOW_CLIENT_TIMEOUT_S = 10.0
+SLOW_CLIENT_CHECK_S = 1.0
+stream_clients = ClientRegistry()
+
+# HTTP server (Hypercorn)
+HTTP_HOST = "0.0.0.0"
+HTTP_PORT = 5000
+
+# Process layout: "single" runs capture, inference and the web server in one interpreter. "split" runs
+# process_video_stream() in its own process, which writes display frames into a shared memory ring per
+# camera (FRAME_RING_SLOTS preallocated slots) and sends only detection records and stats back over a
+# bounded channel, so viewers and dashboards never compete with inference for the GIL.
+PROCESS_MODE = os.environ.get("PROCESS_MODE", "single")
+FRAME_RING_SLOTS = 8
+FRAME_CHANNEL_SIZE = 256
+INFERENCE_STATS_INTERVAL_S = 1.0
+frame_publisher = None   # inference process: RingPublisher standing in for Camera.publish
+inference_link = None    # web process: RingSubscriber fed by the inference process
+inference_report = {}    # web process: latest stats from the inference process
+
+# Server-Sent Events: idle streams get a comment line this often so proxies keep them open
+SSE_KEEPALIVE_S = 15.0
+
+# Inference backend: "degirum" runs the Hailo model; "standin" is a CPU stand-in with the same result
+# shape for dev boxes, CI and benchmarks (optionally replaying a recorded JSON-lines detections file).
+# INFERENCE_RECORD_PATH appends every result of whichever backend runs to such a file, for STANDIN_REPLAY.
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "degirum")
+INFERENCE_RECORD_PATH = os.environ.get("INFERENCE_RECORD_PATH") or None
+MODEL_OPTIONS = {
+    'model_name': "yolov8n_relu6_coco--640x640_quant_hailort_hailo8l_1",
+    'inference_host_address': "@local",
+    'zoo_url': "degirum/hailo",
+    'device_type': "HAILORT/HAILO8L"
+}
+STANDIN_OPTIONS = {
+    'latency_ms': 25.0,
+    'jitter_ms': 5.0,
+    'distribution': "normal",
+    'replay_path': os.environ.get("STANDIN_REPLAY") or None
+}
 
 # UDP Configuration
 UDP_IP = "0.0.0.0"
 UDP_PORT = 5005
-udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+# One sender thread drains this many pending payloads; the oldest are dropped when the network stalls
+UDP_QUEUE_SIZE = 64
+# "json" keeps the original payload; "binary" is the compact versioned format in wire_format.py
+# (stats every UDP_STATS_INTERVAL_S, large detection sets split into UDP_MAX_DATAGRAM chunks)
+UDP_FORMAT = os.environ.get("UDP_FORMAT", "json")
+UDP_STATS_INTERVAL_S = 5.0
+UDP_MAX_DATAGRAM = 1400
+udp_encoder = None
+if UDP_FORMAT == "binary":
+    udp_encoder = WireEncoder(cameras.ids(), stats_interval=UDP_STATS_INTERVAL_S, max_datagram=UDP_MAX_DATAGRAM).encode
+udp_sender = UdpSender(UDP_IP, UDP_PORT, shutdown_flag, maxsize=UDP_QUEUE_SIZE, encode=udp_encoder)
+
+# Frame tracing: every TRACE_SAMPLE_EVERY-th frame per camera records its stage spans (0 = off).
+# The trace is served at /trace and, with TRACE_PATH set, written there on shutdown as Chrome trace JSON.
+TRACE_SAMPLE_EVERY = int(os.environ.get("TRACE_SAMPLE_EVERY", "0"))
+TRACE_MAX_EVENTS = 20000
+TRACE_PATH = os.environ.get("TRACE_PATH") or None
+tracer.configure(TRACE_SAMPLE_EVERY, TRACE_MAX_EVENTS)
 
 def get_sys_info():
     try:
@@ -48,160 +230,531 @@ def get_sys_info():
     except Exception as e:
         print(f"Error getting system info: {e}")
 
-def generate_frames():
-    global latest_frame, last_frame_time
-    target_fps = 15
-    min_frame_interval = 1 / target_fps
-    
+async def watch_stream_client(client, stream_task):
+    # Runs beside each viewer's stream. A write blocked on a full socket never returns control to
+    # generate_frames, so the slow-client check lives out here and cancels the stream instead
     while not shutdown_flag.is_set():
-        current_time = time.time()
-        time_since_last = current_time - last_frame_time
-        
-        if time_since_last < min_frame_interval:
-            time.sleep(min_frame_interval - time_since_last)
-            continue
-            
-        with frame_lock:
-            if latest_frame is None:
-                continue
+        await asyncio.sleep(SLOW_CLIENT_CHECK_S)
+        if client.behind_for(time.monotonic()) > SLOW_CLIENT_TIMEOUT_S:
+            client.disconnect_reason = "slow"
+            print(f"Disconnecting slow video client {client.client_id} ({client.remote_addr})")
+            stream_task.cancel()
+            return
+
+async def generate_frames(camera, target_fps, remote_addr=None, profile=None):
+    client = stream_clients.add(camera.cam_id, target_fps, remote_addr, profile)
+    watchdog = asyncio.create_task(watch_stream_client(client, asyncio.current_task()))
+    last_version = -1
+    next_due = 0.0
+    was_slow = False
+    
+    # JPEGs come pre-encoded from the camera's broadcaster; viewers never touch the inference side.
+    # Each viewer is a coroutine parked on the broadcaster until a new frame is encoded, so idle or
+    # slow viewers cost no thread. Pacing is per client, and a client that can't keep up skips to
+    # the newest frame instead of queueing.
+    try:
+        with camera.jpeg.subscribe(profile):
+            while not shutdown_flag.is_set():
+                now = time.monotonic()
+                if now < next_due:
+                    await asyncio.sleep(next_due - now)
+                    continue
+                    
+                version, jpeg, frame_info = await camera.jpeg.wait_for_jpeg_async(last_version, timeout=1.0, profile=profile)
+                if jpeg is None:
+                    continue
+                    
+                if last_version >= 0:
+                    client.record_gap(version - last_version - 1, was_slow)
+                last_version = version
                 
-            ret, buffer = cv2.imencode('.jpg', latest_frame, [
-                int(cv2.IMWRITE_JPEG_QUALITY), 75,
-                int(cv2.IMWRITE_JPEG_PROGRESSIVE), 1
-            ])
-            
-            if not ret:
-                continue
+                write_start = time.monotonic()
+                client.begin_write(write_start)
+                yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+                write_end = time.monotonic()
                 
-        last_frame_time = current_time
-        yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+                seq, capture_ts = frame_info
+                if capture_ts is not None:
+                    stage_metrics.record("capture_to_mjpeg", write_end - capture_ts)
+                tracer.span("mjpeg_write", seq, camera.cam_id, write_end - write_start, end=write_end, client=client.client_id)
+                was_slow = client.record_write(len(jpeg), write_end - write_start, write_end)
+                next_due = write_start + client.frame_interval
+    finally:
+        watchdog.cancel()
+        stream_clients.remove(client)
 
-def send_detections_udp(detections):
-    try:
-        data = json.dumps({
-            'detections': detections,
-            'timestamp': time.time(),
-            'stats': performance_stats
-        }).encode('utf-8')
-        udp_socket.sendto(data, (UDP_IP, UDP_PORT))
-    except Exception as e:
-        print(f"Error sending UDP data: {e}")
+def send_detections_udp(detections, camera_id=None, frame_seq=None, keyframe=False, timestamp=None, capture_ts=None):
+    # Queued for the sender thread, which stamps a sequence number and sends in order.
+    # timestamp is the frame's capture wall time; capture_ts its monotonic twin for latency tracking.
+    udp_sender.submit({
+        'camera': camera_id,
+        'frame_seq': frame_seq,
+        'keyframe': keyframe,
+        'detections': detections,
+        'timestamp': timestamp if timestamp is not None else time.time(),
+        'stats': udp_stats
+    }, capture_ts=capture_ts)
+
+def udp_summary(stats):
+    # Fixed size whatever the number of viewers or stages; the full breakdown is on
+    # /detections/<cam_id> and /metrics
+    capture = stats.get('capture', {})
+    queues = stats.get('pipeline', {}).get('queues', {})
+    return {
+        'fps': stats.get('fps', 0),
+        'frame_count': stats.get('frame_count', 0),
+        'uptime': stats.get('uptime', 0),
+        'detection_count': stats.get('detection_count', 0),
+        'inference_time': stats.get('inference_time', 0),
+        'processing_time': stats.get('processing_time', 0),
+        'frames_dropped': {
+            'capture': sum(c.get('frames_dropped', 0) for c in capture.values()),
+            'pipeline': sum(q['dropped'] for q in queues.values()),
+            'udp': stats.get('udp', {}).get('dropped', 0),
+        },
+    }
+
+def throughput_stats(start_time):
+    # Rates and percentiles cover the interval since the previous call (one caller per process);
+    # fps is frames actually published
+    latency = stage_metrics.stats()
+    stages = latency['stages']
+    return {
+        'fps': latency['output_fps'],
+        'input_fps': latency['input_fps'],
+        'frame_count': latency['frames_out'],
+        'uptime': round(time.time() - start_time, 1),
+        'detection_count': sum(len(camera.latest_detections) for camera in cameras),
+        'inference_time': stages['inference']['p50_ms'],
+        'processing_time': stages['total']['p50_ms'],
+        'latency': stages
+    }
 
 def monitor_performance():
-    global performance_stats
-    frame_count = 0
+    # Web side only: in split mode the inference process just reports its counters (report_inference_stats)
+    global performance_stats, udp_stats, metrics_page
     start_time = time.time()
+    metrics_page = render_prometheus(performance_stats)
     
     while not shutdown_flag.is_set():
         time.sleep(5)
-        elapsed = time.time() - start_time
-        fps = frame_count / elapsed if elapsed > 0 else 0
-        
         with frame_lock:
-            performance_stats = {
-                'fps': round(fps, 1),
-                'frame_count': frame_count,
-                'uptime': round(elapsed, 1),
-                'detection_count': len(latest_detections),
-                'inference_time': performance_stats.get('inference_time', 0),
-                'processing_time': performance_stats.get('processing_time', 0)
-            }
+            performance_stats = throughput_stats(start_time)
+            if inference_link is not None:
+                performance_stats.update(inference_report.get('stats', {}))
+                performance_stats['inference_process'] = inference_report.get('process', {})
+                performance_stats['split'] = dict(inference_link.stats(), channel=inference_report.get('channel', {}))
+            else:
+                performance_stats.update(inference_stats())
+            performance_stats['jpeg'] = {camera.cam_id: camera.jpeg.stats() for camera in cameras}
+            performance_stats['clients'] = stream_clients.stats()
+            performance_stats['clients_disconnected_slow'] = stream_clients.disconnected_slow
+            performance_stats['clients_bytes_sent'] = stream_clients.bytes_sent()
+            performance_stats['sse'] = {camera.cam_id: camera.events.stats() for camera in cameras}
+            performance_stats['process'] = process_stats()
+            if tracer.enabled:
+                performance_stats['trace'] = tracer.stats()
+            stats = dict(performance_stats)
+            udp_stats = udp_summary(stats)
+            
+        try:
+            metrics_page = render_prometheus(stats)
+        except Exception as e:
+            print(f"Error rendering metrics: {e}")
             
-        frame_count = 0
-        start_time = time.time()
+        # Push the dashboard's stats panel to SSE subscribers instead of having it poll
+        for camera in cameras:
+            if camera.events.subscribers:
+                camera.events.publish('stats', dashboard_stats(stats, camera))
+
+def inference_stats():
+    # The capture/inference side of the stats; in split mode the inference process reports these instead
+    stats = {}
+    if pipeline is not None:
+        stats['pipeline'] = pipeline.stats()
+        if pipeline.rate_controller is not None:
+            stats['rate_control'] = pipeline.rate_controller.stats()
+        if pipeline.motion_gate is not None:
+            stats['motion_gate'] = pipeline.motion_gate.stats()
+    stats['capture'] = {camera.cam_id: camera.capture_stats() for camera in cameras}
+    stats['udp'] = udp_sender.stats()
+    if PUBLISH_MODE == "delta":
+        stats['delta'] = {camera.cam_id: camera.change_filter.stats() for camera in cameras}
+    if TRACKING:
+        stats['tracking'] = {camera.cam_id: camera.tracker.stats() for camera in cameras}
+    return stats
+
+def render_prometheus(stats):
+    # Built from the stats snapshot above and the lock-free histogram counts, never under frame_lock
+    w = MetricsWriter()
+    w.gauge('uptime_seconds', 'Seconds since the monitor started', stats.get('uptime', 0))
+    w.counter('frames_captured_total', 'Frames read from the cameras', stage_metrics.frames_in.count)
+    w.counter('frames_published_total', 'Frames through the whole pipeline', stage_metrics.frames_out.count)
+    w.gauge('input_fps', 'Captured frames per second over the last interval', stats.get('input_fps', 0))
+    w.gauge('output_fps', 'Published frames per second over the last interval', stats.get('fps', 0))
+    w.gauge('detections', 'Objects in the latest detection set',
+            [({'camera': camera.cam_id}, len(camera.latest_detections)) for camera in cameras])
+    w.histograms('stage_latency_seconds', 'Per-stage latency', stage_metrics.histograms)
+
+    # Frames dropped per stage: overwritten in the capture buffer, evicted from a pipeline queue, or
+    # evicted from the UDP send queue
+    capture = stats.get('capture', {})
+    dropped = [({'stage': 'capture', 'camera': cam_id}, c.get('frames_dropped', 0)) for cam_id, c in capture.items()]
+    pipeline_stats = stats.get('pipeline', {})
+    for name, queue in pipeline_stats.get('queues', {}).items():
+        dropped.append(({'stage': name, 'camera': ''}, queue['dropped']))
+    dropped.append(({'stage': 'udp', 'camera': ''}, stats.get('udp', {}).get('dropped', 0)))
+    w.counter('frames_dropped_total', 'Frames dropped, by stage', dropped)
+
+    if pipeline_stats:
+        w.counter('pipeline_completed_total', 'Frames completed by the postprocess stage', pipeline_stats['completed'])
+        w.gauge('pipeline_in_flight', 'Frames submitted to the model and not yet returned', pipeline_stats['in_flight'])
+        w.gauge('pipeline_queue_depth', 'Items waiting in each stage queue',
+                [({'queue': name}, q['depth']) for name, q in pipeline_stats['queues'].items()])
+        w.counter('inference_scheduled_total', 'Frames handed to the model, by camera',
+                  [({'camera': cam_id}, n) for cam_id, n in pipeline_stats['scheduled'].items()])
+    if 'rate_control' in stats:
+        # Not drops: with TRACKING on these frames are still shown, with predicted boxes
+        w.counter('inference_skipped_total', 'Frames the adaptive rate controller kept from the model',
+                  stats['rate_control']['skipped'])
+        w.gauge('rate_control_target_fps', 'Inference rate the adaptive controller is admitting',
+                stats['rate_control']['target_fps'])
+
+    w.counter('capture_outages_total', 'Times a camera stopped delivering frames',
+              [({'camera': cam_id}, c.get('outages', 0)) for cam_id, c in capture.items()])
+    w.counter('capture_reconnects_total', 'Attempts to reopen a camera, successful or not',
+              [({'camera': cam_id}, c.get('reconnects', 0)) for cam_id, c in capture.items()])
+    w.counter('capture_downtime_seconds_total', 'Time without frames, including an outage still in progress',
+              [({'camera': cam_id}, c.get('total_downtime_s', 0)) for cam_id, c in capture.items()])
+    w.gauge('capture_last_recovery_seconds', 'From the last good frame to the first frame after the latest outage',
+            [({'camera': cam_id}, c['last_recovery_s']) for cam_id, c in capture.items()
+             if c.get('last_recovery_s') is not None])
+    w.counter('capture_stalls_total', 'Stalls detected by the watchdog',
+              [({'camera': cam_id}, c.get('stalls', 0)) for cam_id, c in capture.items()])
+    w.gauge('capture_streaming', 'Whether the camera is currently delivering frames',
+            [({'camera': cam_id}, c.get('state') == 'streaming') for cam_id, c in capture.items()])
+
+    clients = stats.get('clients', [])
+    w.gauge('mjpeg_clients', 'Connected MJPEG viewers',
+            [({'camera': camera.cam_id}, sum(1 for c in clients if c['camera'] == camera.cam_id)) for camera in cameras])
+    w.counter('mjpeg_clients_disconnected_slow_total', 'Viewers dropped for falling behind',
+              stats.get('clients_disconnected_slow', 0))
+    w.counter('mjpeg_bytes_sent_total', 'Bytes written to MJPEG viewers, including ones that have left',
+              stats.get('clients_bytes_sent', 0))
+
+    encodes, deliveries, hit_ratio = [], [], []
+    for cam_id, renditions in stats.get('jpeg', {}).items():
+        for profile, r in renditions.items():
+            labels = {'camera': cam_id, 'profile': profile}
+            encodes.append((labels, r['encodes']))
+            deliveries.append((labels, r['deliveries']))
+            hit_ratio.append((labels, round(r['cache_hits'] / r['deliveries'], 4) if r['deliveries'] else 0))
+    w.counter('jpeg_encodes_total', 'JPEG encodes, by rendition', encodes)
+    w.counter('jpeg_deliveries_total', 'JPEG frames written to viewers, by rendition', deliveries)
+    w.gauge('jpeg_cache_hit_ratio', 'Share of deliveries that reused bytes already sent to another viewer', hit_ratio)
+
+    w.gauge('sse_subscribers', 'Connected detection stream subscribers',
+            [({'camera': cam_id}, s['subscribers']) for cam_id, s in stats.get('sse', {}).items()])
+
+    udp = stats.get('udp', {})
+    if udp:
+        w.counter('udp_messages_sent_total', 'Detection messages sent over UDP', udp['sent'])
+        w.counter('udp_send_errors_total', 'UDP send failures', udp['errors'])
+        w.counter('udp_bytes_sent_total', 'Bytes sent over UDP', udp['bytes_sent'])
+        w.gauge('udp_queue_depth', 'Messages waiting for the UDP sender', udp['queue_depth'])
+        w.gauge('udp_queue_size', 'Capacity of the UDP send queue', udp['queue_size'])
+
+    if pipeline_stats.get('tiling'):
+        w.counter('inference_tiles_total', 'Tiles sent to the model for tiled cameras', pipeline_stats['tiles_submitted'])
+        w.gauge('inference_tiles_per_frame', 'Model inputs per frame, global view included',
+                [({'camera': cam_id}, t['tiles'] + t['global_view']) for cam_id, t in pipeline_stats['tiling'].items()])
+
+    if 'motion_gate' in stats:
+        sources = stats['motion_gate']['sources']
+        w.counter('motion_gate_checked_total', 'Frames checked for motion',
+                  [({'camera': cam_id}, s['checked']) for cam_id, s in sources.items()])
+        w.counter('motion_gate_skipped_total', 'Frames that skipped the model because nothing moved',
+                  [({'camera': cam_id}, s['skipped']) for cam_id, s in sources.items()])
+        w.gauge('motion_gate_motion_ratio', 'Share of pixels changed in the latest checked frame',
+                [({'camera': cam_id}, s['motion']) for cam_id, s in sources.items()])
+        w.counter('motion_gate_saved_seconds_total', 'Estimated accelerator time not spent on skipped frames',
+                  stats['motion_gate']['saved_ms'] / 1000)
+
+    if 'tracking' in stats:
+        w.gauge('tracks', 'Live tracks',
+                [({'camera': cam_id}, t['tracks']) for cam_id, t in stats['tracking'].items()])
+        w.counter('tracks_started_total', 'Track ids assigned',
+                  [({'camera': cam_id}, t['tracks_started']) for cam_id, t in stats['tracking'].items()])
+        w.counter('tracker_predicted_frames_total', 'Frames whose boxes were predicted instead of inferred',
+                  [({'camera': cam_id}, t['predictions']) for cam_id, t in stats['tracking'].items()])
+
+    if 'delta' in stats:
+        w.counter('delta_suppressed_total', 'Detection sets not published because nothing changed',
+                  [({'camera': cam_id}, d['suppressed']) for cam_id, d in stats['delta'].items()])
+
+    process = stats.get('process', {})
+    if process:
+        w.counter('process_cpu_seconds_total', 'User and system CPU time', process['cpu_seconds'])
+        w.gauge('process_resident_memory_bytes', 'Resident memory', process['rss_bytes'])
+        w.gauge('process_threads', 'Threads in the server process', process['threads'])
+
+    inference_process = stats.get('inference_process', {})
+    if inference_process:
+        w.counter('inference_process_cpu_seconds_total', 'User and system CPU time of the inference process',
+                  inference_process['cpu_seconds'])
+        w.gauge('inference_process_resident_memory_bytes', 'Resident memory of the inference process',
+                inference_process['rss_bytes'])
+    if 'split' in stats:
+        w.counter('split_records_dropped_total', 'Frame records dropped because the web process fell behind',
+                  stats['split']['channel'].get('dropped', 0))
+        w.counter('split_frames_stale_total', 'Frames overwritten in the ring before the web process read them',
+                  stats['split']['stale'])
+    return w.render()
+
+def dashboard_stats(stats, camera):
+    _, _, camera_stats = camera.snapshot()
+    return {
+        'camera': camera.cam_id,
+        'fps': stats.get('fps', 0),
+        'frame_count': stats.get('frame_count', 0),
+        'uptime': stats.get('uptime', 0),
+        'inference_time': camera_stats.get('inference_time', stats.get('inference_time', 0)),
+        'processing_time': stats.get('processing_time', 0)
+    }
+
+async def generate_events(camera, last_event_id=None):
+    # Every detection set is serialized once, then written to each subscriber as-is
+    last_version = camera.events.latest_version()
+    if last_event_id is not None:
+        resume = camera.events.version_for_event_id(last_event_id)
+        if resume is not None:
+            last_version = resume
+    
+    with camera.events.subscribe():
+        with frame_lock:
+            stats = dict(performance_stats)
+        yield b'retry: 2000\n\n'
+        yield ('event: stats\ndata: ' + json.dumps(dashboard_stats(stats, camera)) + '\n\n').encode('utf-8')
+        
+        while not shutdown_flag.is_set():
+            last_version, events = await camera.events.wait_for_events_async(last_version, timeout=SSE_KEEPALIVE_S)
+            if not events:
+                yield b': keepalive\n\n'
+                continue
+            yield b''.join(ev.encode() for ev in events)
+
+def postprocess_frame(job):
+    packet = job.packet
+    camera = cameras.get(packet.source_id)
+    results = job.result
+    if PRINT_RESULTS:
+        print(results)
+    
+    if job.skip and camera.tracker is not None:
+        # No fresh inference: move the tracks along to this frame's capture time instead
+        track_start = time.perf_counter()
+        detections = camera.tracker.predict(packet.capture_ts, packet.wall_ts)
+    else:
+        detections = scale_detections(results.results, packet.wall_ts, job.letterbox, camera.display_size)
+        track_start = time.perf_counter()
+        if camera.tracker is not None:
+            detections = camera.tracker.update(detections, packet.capture_ts)
+    if camera.tracker is not None:
+        stage_metrics.record("track", time.perf_counter() - track_start)
+
+    overlay_start = time.perf_counter()
+    display_frame = draw_detections(cv2.resize(packet.frame, camera.display_size), detections)
+    overlay_time = time.perf_counter() - overlay_start
+    stage_metrics.record("overlay", overlay_time)
+    tracer.span("overlay", packet.seq, camera.cam_id, overlay_time)
+
+    publish, keyframe = True, False
+    if camera.change_filter is not None:
+        publish, keyframe = camera.change_filter.update(detections)
+
+    frame_stats = {
+        'frame_seq': packet.seq,
+        'frame_age_ms': round((time.monotonic() - packet.capture_ts) * 1000, 1),
+        'capture_dropped': camera.buffer.frames_dropped,
+        'skipped_inference': job.skip
+    }
+    if not job.skip:
+        # Skipped frames keep showing the inference time of the last frame that ran the model
+        frame_stats['inference_time'] = round((job.timings['infer_done'] - job.timings['infer_submit']) * 1000, 1)
+    if frame_publisher is not None:
+        # Inference process: the frame goes into shared memory, only the records cross to the web process
+        if publish:
+            camera.latest_detections = detections
+        frame_publisher.publish(camera.cam_id, display_frame, detections if publish else None, frame_stats,
+                                seq=packet.seq, timestamp=packet.wall_ts, keyframe=keyframe, capture_ts=packet.capture_ts)
+    else:
+        camera.publish(display_frame, detections if publish else None, frame_stats,
+                       seq=packet.seq, timestamp=packet.wall_ts, keyframe=keyframe, capture_ts=packet.capture_ts)
+    
+    if publish:
+        send_detections_udp(detections, camera.cam_id, packet.seq, keyframe,
+                            timestamp=packet.wall_ts, capture_ts=packet.capture_ts)
+    
+    stage_metrics.record("total", time.monotonic() - packet.capture_ts)
+    stage_metrics.frames_out.mark()
+    return job
 
 def process_video_stream():
-    global latest_frame, latest_detections, performance_stats
+    global pipeline
     
     print("Initializing system...")
     get_sys_info()
 
     try:
-        # Initialize camera
-        video_path = "rtsp://192.168.136.100:554/live/0"
-        cap = cv2.VideoCapture(video_path)
-        cap.set(cv2.CAP_PROP_BUFFERSIZE, 2)
-        cap.set(cv2.CAP_PROP_FPS, 15)
-        
-        if not cap.isOpened():
-            raise Exception(f"Could not open video: {video_path}")
-
-        # Load model
-        model = dg.load_model(
-            model_name="yolov8n_relu6_coco--640x640_quant_hailort_hailo8l_1",
-            inference_host_address="@local",
-            zoo_url="degirum/hailo",
-            device_type="HAILORT/HAILO8L"
-        )
-        model.image_backend = 'opencv'
-        model.overlay_show_prob = True
-        model.overlay_show_bbox = True
-        model.overlay_line_width = 2
+        udp_sender.start()
 
-        print(f"Processing video: {video_path}")
-        frame_counter = 0
-        skip_frames = 1
-        
-        while not shutdown_flag.is_set():
-            start_processing = time.time()
-            ret, frame = cap.read()
-            if not ret:
-                print("Failed to grab frame")
-                break
+        # Initialize cameras; each one gets its own capture thread so a slow inference never backs up a source
+        reconnect = ReconnectPolicy(initial_delay=RECONNECT_INITIAL_DELAY_S, max_delay=RECONNECT_MAX_DELAY_S)
+        if cameras.start_all(shutdown_flag, reconnect=reconnect, stall_timeout=STALL_TIMEOUT_S) == 0:
+            raise Exception(f"Could not open any video source: {list(CAMERA_SOURCES.values())}")
 
-            frame_counter += 1
-            if frame_counter % (skip_frames + 1) != 0:
-                continue
+        # Load model once and share it across every camera
+        options = STANDIN_OPTIONS if INFERENCE_BACKEND == "standin" else MODEL_OPTIONS
+        model = make_backend(INFERENCE_BACKEND, record_path=INFERENCE_RECORD_PATH, **options)
+        print(f"Inference backend: {model.describe()}")
 
-            model_frame = cv2.resize(frame, (640, 640))
-            
-            inference_start = time.time()
-            results = model(model_frame)
-            print(results)
-            inference_time = (time.time() - inference_start) * 1000
-            performance_stats['inference_time'] = round(inference_time, 1)
-            
-            detections = []
-            display_frame = cv2.resize(frame, (1280, 720))
-            
-            for det in results.results:
-                x1 = int(det["bbox"][0] * (1280/640))
-                y1 = int(det["bbox"][1] * (720/640))
-                x2 = int(det["bbox"][2] * (1280/640))
-                y2 = int(det["bbox"][3] * (720/640))
-                
-                cv2.rectangle(display_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                cv2.putText(display_frame, f"{det['label']} {det['score']:.2f}", 
-                           (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 2)
-                
-                detections.append({
-                    "label": det["label"],
-                    "score": float(det["score"]),
-                    "bbox": [x1, y1, x2, y2],
-                    "timestamp": time.time()
-                })
+        print(f"Processing cameras: {cameras.ids()}")
+        pipeline = VideoPipeline(
+            RoundRobinScheduler(cameras.buffers()), model, postprocess_frame, shutdown_flag,
+            queue_depth=PIPELINE_QUEUE_DEPTH,
+            drop_policy=PIPELINE_DROP_POLICY,
+            rate_controller=AdaptiveRateController(
+                latency_budget_ms=LATENCY_BUDGET_MS,
+                min_fps=MIN_INFERENCE_FPS,
+                max_fps=MAX_INFERENCE_FPS
+            ),
+            motion_gate=MotionGate(
+                size=MOTION_GATE_SIZE,
+                pixel_delta=MOTION_PIXEL_DELTA,
+                threshold=MOTION_THRESHOLD,
+                background_rate=MOTION_BACKGROUND_RATE,
+                refresh_interval=MOTION_REFRESH_S
+            ) if MOTION_GATE else None,
+            display_skipped=TRACKING,
+            tile_layouts={cam_id: TileLayout(**options) for cam_id, options in TILE_LAYOUTS.items()}
+        )
+        pipeline.start()
 
-            with frame_lock:
-                latest_frame = display_frame
-                latest_detections = detections
-            
-            threading.Thread(
-                target=send_detections_udp, 
-                args=(detections,), 
-                daemon=True
-            ).start()
-            
-            performance_stats['processing_time'] = round(
-                (time.time() - start_processing) * 1000, 1
-            )
+        while not shutdown_flag.is_set() and pipeline.is_alive():
+            if cameras.all_failed():
+                break
+            time.sleep(0.5)
 
     except Exception as e:
         print(f"Error in video processing: {e}")
     finally:
-        cap.release()
-        udp_socket.close()
+        shutdown_flag.set()
+        if pipeline is not None:
+            pipeline.stop()
+            pipeline.join(timeout=1)
+        udp_sender.stop()
+        udp_sender.join(timeout=1)
+        if TRACE_PATH and tracer.enabled:
+            print(f"Frame trace written to {tracer.dump(TRACE_PATH)}")
         print("Video processing stopped")
 
+def report_inference_stats():
+    # Inference process: push stats and cumulative latency histograms to the web process, which serves
+    # /detections/<cam_id> and /metrics. The only summary kept here is the one this process's UDP
+    # messages carry.
+    global udp_stats
+    start_time = time.time()
+    while not shutdown_flag.wait(INFERENCE_STATS_INTERVAL_S):
+        stats = inference_stats()
+        udp_stats = udp_summary(dict(throughput_stats(start_time), **stats))
+        frame_publisher.send_stats({
+            'stats': stats,
+            'process': process_stats(),
+            'metrics': stage_metrics.export(),
+            'channel': frame_publisher.stats()
+        })
+
+def follow_web_process(stop_event, parent_pid):
+    # Inference process: stop when the web process asks to, or if it has gone away without asking
+    while not shutdown_flag.is_set():
+        if stop_event.wait(1.0) or os.getppid() != parent_pid:
+            shutdown_flag.set()
+
+def run_inference_process(ring_specs, channel, stop_event, parent_pid):
+    # Entry point of the inference process in split mode; this module is imported fresh, so cameras,
+    # the UDP sender and the tracer are this process's own
+    global frame_publisher
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C reaches the whole group; the web process stops us
+    rings = {cam_id: FrameRing.attach(readonly=False, **spec) for cam_id, spec in ring_specs.items()}
+    frame_publisher = RingPublisher(rings, channel)
+    start_thread(lambda: follow_web_process(stop_event, parent_pid))
+    start_thread(report_inference_stats)
+    try:
+        process_video_stream()
+    finally:
+        shutdown_flag.set()
+        for t in running_threads:
+            t.join(timeout=2)
+        for ring in rings.values():
+            ring.close()
+
+def publish_remote_frame(cam_id, frame, detections, stats, seq, timestamp, keyframe, capture_ts, is_valid):
+    cameras.get(cam_id).publish(frame, detections, stats, seq=seq, timestamp=timestamp, keyframe=keyframe,
+                                capture_ts=capture_ts, is_valid=is_valid)
+
+def absorb_inference_stats(report):
+    global inference_report
+    stage_metrics.absorb(report['metrics'])
+    for cam_id, capture in report['stats'].get('capture', {}).items():
+        camera = cameras.get(cam_id)
+        if camera is not None:
+            camera.remote_capture = capture
+    with frame_lock:
+        inference_report = report
+
+def run_split_inference():
+    # Web process in split mode: owns the frame rings and the inference process, and republishes what it
+    # sends through the usual Camera objects, whose frames are then read-only views onto the rings
+    global inference_link
+    context = multiprocessing.get_context("spawn")
+    rings = {}
+    process = None
+    try:
+        for camera in cameras:
+            width, height = camera.display_size
+            rings[camera.cam_id] = FrameRing.create(FRAME_RING_SLOTS, (height, width, 3), readonly=True)
+        channel = context.Queue(maxsize=FRAME_CHANNEL_SIZE)
+        stop_event = context.Event()
+        process = context.Process(
+            target=run_inference_process, name="inference",
+            args=({cam_id: ring.spec() for cam_id, ring in rings.items()}, channel, stop_event, os.getpid())
+        )
+        process.start()
+        print(f"Inference process started (pid {process.pid})")
+
+        for camera in cameras:
+            camera.jpeg.start(shutdown_flag)
+        inference_link = RingSubscriber(channel, rings, shutdown_flag, publish_remote_frame, absorb_inference_stats)
+        inference_link.start()
+
+        while not shutdown_flag.is_set() and process.is_alive():
+            process.join(0.5)
+        if not process.is_alive():
+            print(f"Inference process exited with code {process.exitcode}")
+    except Exception as e:
+        print(f"Error in inference process supervisor: {e}")
+    finally:
+        shutdown_flag.set()
+        if process is not None and process.pid is not None:
+            stop_event.set()
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for ring in rings.values():
+            ring.close()
+            ring.unlink()
+        print("Inference process stopped")
+
 def start_thread(target, daemon=True):
     t = threading.Thread(target=target, daemon=daemon)
     t.start()
@@ -223,14 +776,14 @@ def shutdown_server():
     os.kill(os.getpid(), signal.SIGINT)
 
 @app.route('/static/<path:filename>')
-def static_files(filename):
-    return send_from_directory('static', filename)
+async def static_files(filename):
+    return await send_from_directory('static', filename)
 
 @app.route('/')
-def index():
+async def index():
     if not session.get('logged_in'):
         return redirect(url_for('login'))
-    return render_template_string('''
+    return await render_template_string('''
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -554,13 +1107,20 @@ def index():
             <div class="video-container">
                 <div class="video-header">
                     <h2><i class="fas fa-video"></i> Live Camera Feed</h2>
+                    {% if camera_ids|length > 1 %}
+                    <select id="camera-select" class="btn btn-sm">
+                        {% for cam in camera_ids %}
+                        <option value="{{ cam }}">{{ cam }}</option>
+                        {% endfor %}
+                    </select>
+                    {% endif %}
                     <div id="connection-status" style="display: flex; align-items: center; gap: 0.5rem;">
                         <span class="status-dot" style="height: 10px; width: 10px; background-color: #27ae60; border-radius: 50%;"></span>
                         <span>Connected</span>
                     </div>
                 </div>
                 <div class="video-wrapper">
-                    <img src="{{ url_for('video_feed') }}" id="video-feed">
+                    <img src="{{ url_for('video_feed', cam_id=camera_ids[0]) }}" id="video-feed">
                 </div>
             </div>
             
@@ -615,55 +1175,88 @@ def index():
     </div>
     
     <script>
-        // Function to update stats
+        let currentCamera = '{{ camera_ids[0] }}';
+
+        let eventSource = null;
+
+        function showConnectionError(message) {
+            document.getElementById('connection-status').innerHTML = `
+                <span class="status-dot" style="height: 10px; width: 10px; background-color: #e74c3c; border-radius: 50%;"></span>
+                <span>${message}</span>
+            `;
+        }
+
+        // Function to render performance stats
+        function renderStats(stats) {
+            document.getElementById('stat-fps').textContent = stats.fps;
+            document.getElementById('stat-inference').textContent = stats.inference_time + ' ms';
+            document.getElementById('stat-processing').textContent = stats.processing_time + ' ms';
+            document.getElementById('stat-uptime').textContent = stats.uptime + 's';
+            document.getElementById('stat-frames').textContent = stats.frame_count;
+        }
+
+        // Function to render detections
+        function renderDetections(detections) {
+            const detectionsContent = document.getElementById('detections-content');
+            const detectionCount = document.getElementById('detection-count');
+            
+            if (detections && detections.length > 0) {
+                detectionCount.textContent = detections.length;
+                detectionCount.style.backgroundColor = detections.length > 0 ? '#e74c3c' : '#2ecc71';
+                
+                let html = '';
+                detections.slice(0, 10).forEach(det => {
+                    html += `
+                        <div class="detection-item">
+                            <span class="detection-label">${det.label}</span>
+                            <span class="detection-confidence">${(det.score * 100).toFixed(1)}%</span>
+                        </div>
+                    `;
+                });
+                
+                detectionsContent.innerHTML = html;
+            } else {
+                detectionCount.textContent = '0';
+                detectionCount.style.backgroundColor = '#2ecc71';
+                detectionsContent.innerHTML = `
+                    <div style="text-align: center; padding: 1rem; color: #7f8c8d;">
+                        No detections
+                    </div>
+                `;
+            }
+        }
+
+        // Function to fetch stats once (initial load and refresh button)
         function updateStats() {
-            fetch('/detections')
+            fetch('/detections/' + encodeURIComponent(currentCamera))
                 .then(response => response.json())
                 .then(data => {
-                    // Update performance stats
-                    document.getElementById('stat-fps').textContent = data.stats.fps;
-                    document.getElementById('stat-inference').textContent = data.stats.inference_time + ' ms';
-                    document.getElementById('stat-processing').textContent = data.stats.processing_time + ' ms';
-                    document.getElementById('stat-uptime').textContent = data.stats.uptime + 's';
-                    document.getElementById('stat-frames').textContent = data.stats.frame_count;
-                    
-                    // Update detections
-                    const detectionsContent = document.getElementById('detections-content');
-                    const detectionCount = document.getElementById('detection-count');
-                    
-                    if (data.detections && data.detections.length > 0) {
-                        detectionCount.textContent = data.detections.length;
-                        detectionCount.style.backgroundColor = data.detections.length > 0 ? '#e74c3c' : '#2ecc71';
-                        
-                        let html = '';
-                        data.detections.slice(0, 10).forEach(det => {
-                            html += `
-                                <div class="detection-item">
-                                    <span class="detection-label">${det.label}</span>
-                                    <span class="detection-confidence">${(det.score * 100).toFixed(1)}%</span>
-                                </div>
-                            `;
-                        });
-                        
-                        detectionsContent.innerHTML = html;
-                    } else {
-                        detectionCount.textContent = '0';
-                        detectionCount.style.backgroundColor = '#2ecc71';
-                        detectionsContent.innerHTML = `
-                            <div style="text-align: center; padding: 1rem; color: #7f8c8d;">
-                                No detections
-                            </div>
-                        `;
-                    }
+                    renderStats(data.stats);
+                    renderDetections(data.detections);
                 })
                 .catch(error => {
                     console.error('Error fetching stats:', error);
-                    document.getElementById('connection-status').innerHTML = `
-                        <span class="status-dot" style="height: 10px; width: 10px; background-color: #e74c3c; border-radius: 50%;"></span>
-                        <span>Connection Error</span>
-                    `;
+                    showConnectionError('Connection Error');
                 });
         }
+
+        // Function to subscribe to pushed detections and stats
+        function connectEvents() {
+            if (eventSource) {
+                eventSource.close();
+            }
+            eventSource = new EventSource('/detections/stream/' + encodeURIComponent(currentCamera));
+            eventSource.addEventListener('detections', event => {
+                renderDetections(JSON.parse(event.data).detections);
+            });
+            eventSource.addEventListener('stats', event => {
+                renderStats(JSON.parse(event.data));
+            });
+            eventSource.onerror = function() {
+                // EventSource reconnects on its own
+                showConnectionError('Connection Error');
+            };
+        }
         
         // Function to show notification
         function showNotification(message, type = 'success') {
@@ -700,9 +1293,9 @@ def index():
         
         // Initialize
         document.addEventListener('DOMContentLoaded', function() {
-            // Update stats immediately and then every 2 seconds
+            // Load stats once, then receive updates as they happen
             updateStats();
-            setInterval(updateStats, 2000);
+            connectEvents();
             
             // Set up refresh button
             document.getElementById('refresh-stats').addEventListener('click', updateStats);
@@ -710,6 +1303,17 @@ def index():
             // Check video feed connection
             checkVideoFeed();
             
+            // Switch camera
+            const cameraSelect = document.getElementById('camera-select');
+            if (cameraSelect) {
+                cameraSelect.addEventListener('change', function() {
+                    currentCamera = this.value;
+                    document.getElementById('video-feed').src = '/video_feed/' + encodeURIComponent(currentCamera);
+                    updateStats();
+                    connectEvents();
+                });
+            }
+            
             // Show welcome notification
             setTimeout(() => {
                 showNotification('Successfully connected to surveillance system');
@@ -718,12 +1322,13 @@ def index():
     </script>
 </body>
 </html>
-    ''')
+    ''', camera_ids=cameras.ids())
 @app.route('/login', methods=['GET', 'POST'])
-def login():
+async def login():
     if request.method == 'POST':
-        username = request.form.get('username')
-        password = request.form.get('password')
+        form = await request.form
+        username = form.get('username')
+        password = form.get('password')
         
         if username == VALID_USERNAME and password == VALID_PASSWORD:
             session['logged_in'] = True
@@ -735,7 +1340,7 @@ def login():
     if session.get('logged_in'):
         return redirect(url_for('index'))
     
-    return render_template_string('''
+    return await render_template_string('''
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -1062,11 +1667,11 @@ def login():
     ''')
 
 @app.route('/logout')
-def logout():
+async def logout():
     session.pop('logged_in', None)
     session.pop('username', None)
     threading.Thread(target=shutdown_server).start()
-    return render_template_string('''
+    return await render_template_string('''
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -1203,21 +1808,78 @@ def logout():
     ''')
 
 @app.route('/video_feed')
-def video_feed():
+@app.route('/video_feed/<cam_id>')
+async def video_feed(cam_id=None):
     if not session.get('logged_in'):
         return Response("Unauthorized", status=401)
-    return Response(generate_frames(),
-                   mimetype='multipart/x-mixed-replace; boundary=frame')
+    camera = cameras.get(cam_id) if cam_id else cameras.default()
+    if camera is None:
+        return Response("Unknown camera", status=404)
+    try:
+        target_fps = float(request.args.get('fps', DEFAULT_CLIENT_FPS))
+    except ValueError:
+        return Response("Invalid fps", status=400)
+    if not math.isfinite(target_fps):
+        return Response("Invalid fps", status=400)
+    target_fps = min(max(target_fps, 0.1), MAX_CLIENT_FPS)
+    profile = request.args.get('profile', camera.jpeg.default_profile)
+    if camera.jpeg.rendition(profile) is None:
+        return Response(f"Unknown profile, expected one of: {', '.join(camera.jpeg.renditions)}", status=400)
+    response = Response(generate_frames(camera, target_fps, request.remote_addr, profile),
+                        mimetype='multipart/x-mixed-replace; boundary=frame')
+    response.timeout = None  # streams run until the viewer leaves
+    return response
 
 @app.route('/detections')
-def get_detections():
+@app.route('/detections/<cam_id>')
+async def get_detections(cam_id=None):
     if not session.get('logged_in'):
         return jsonify({"error": "Unauthorized"}), 401
+    camera = cameras.get(cam_id) if cam_id else cameras.default()
+    if camera is None:
+        return jsonify({"error": "Unknown camera"}), 404
+    _, detections, camera_stats = camera.snapshot()
     with frame_lock:
-        return jsonify({
-            'detections': latest_detections,
-            'stats': performance_stats
-        })
+        stats = dict(performance_stats)
+    stats.update(camera_stats)
+    stats['capture'] = camera.capture_stats()
+    return jsonify({
+        'camera': camera.cam_id,
+        'detections': detections,
+        'stats': stats
+    })
+
+@app.route('/detections/stream')
+@app.route('/detections/stream/<cam_id>')
+async def detections_stream(cam_id=None):
+    if not session.get('logged_in'):
+        return Response("Unauthorized", status=401)
+    camera = cameras.get(cam_id) if cam_id else cameras.default()
+    if camera is None:
+        return Response("Unknown camera", status=404)
+    response = Response(generate_events(camera, request.headers.get('Last-Event-ID')),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.timeout = None
+    return response
+
+@app.route('/metrics')
+async def metrics():
+    # Unauthenticated and read-only so Prometheus can scrape it; serves the page cached by monitor_performance
+    return Response(metrics_page, content_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.route('/trace')
+async def frame_trace():
+    # Sampled frame spans as Chrome trace JSON (chrome://tracing or ui.perfetto.dev)
+    if not session.get('logged_in'):
+        return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(tracer.trace())
+
+@app.route('/cameras')
+async def list_cameras():
+    if not session.get('logged_in'):
+        return jsonify({"error": "Unauthorized"}), 401
+    return jsonify({'cameras': cameras.ids()})
 
 if __name__ == "__main__":
     # Create static directory if it doesn't exist
@@ -1226,13 +1888,16 @@ if __name__ == "__main__":
     
     # Start all threads through our thread manager
     start_thread(monitor_performance)
-    start_thread(process_video_stream)
+    start_thread(run_split_inference if PROCESS_MODE == "split" else process_video_stream)
     
-    # Start Flask server
-    app.run(
-        host='0.0.0.0', 
-        port=5000, 
-        threaded=True, 
-        processes=1,
-        debug=False
-    )
+    # Serve over ASGI with Hypercorn: every request and stream is a coroutine on one event loop,
+    # while capture, inference and encoding keep their own threads
+    config = HypercornConfig()
+    config.bind = [f"{HTTP_HOST}:{HTTP_PORT}"]
+    config.graceful_timeout = 2.0
+    asyncio.run(serve(app, config))
+    
+    # serve() returns on Ctrl+C / SIGTERM; let the pipeline wind down (and write the trace) before exiting
+    shutdown_flag.set()
+    for t in running_threads:
+        t.join(timeout=2)
@@ -0,0 +1,198 @@
+import json
+import struct
+import time
+
+import numpy as np
+
+# Binary UDP detection feed, version 2. Every datagram starts with the same little-endian header:
+#
+#   magic     2s   b"HD"
+#   version   u8   WIRE_VERSION
+#   msg_type  u8   MSG_DETECTIONS / MSG_KEYFRAME / MSG_STATS / MSG_METADATA
+#   camera    u16  index into the camera list sent in MSG_METADATA
+#   seq       u32  sender sequence number (shared by all chunks of one message)
+#   frame_seq u32  capture sequence number of the frame
+#   timestamp f64  wall-clock time of the frame
+#   chunk     u16  chunk index
+#   chunks    u16  chunk count
+#   count     u16  detections in this chunk (MSG_DETECTIONS) or payload bytes (others)
+#
+# MSG_DETECTIONS and MSG_KEYFRAME bodies are `count` DETECTION_DTYPE records (a keyframe is a full
+# resync point when only changes are published). Version 2 added the track id to each record; the
+# decoder still reads version 1 records, which have none. MSG_STATS and MSG_METADATA bodies are
+# UTF-8 JSON. Metadata carries the label table and camera list and is repeated with every stats
+# message so late joiners can decode.
+WIRE_MAGIC = b"HD"
+WIRE_VERSION = 2
+MSG_DETECTIONS = 1
+MSG_STATS = 2
+MSG_METADATA = 3
+MSG_KEYFRAME = 4
+
+HEADER = struct.Struct("<2sBBHIIdHHH")
+DETECTION_DTYPE = np.dtype([
+    ('label', '<u2'),     # index into the metadata label table
+    ('score', '<u2'),     # score * 65535
+    ('box', '<i2', 4),    # x1, y1, x2, y2 in display pixels
+    ('track_id', '<u4'),  # tracker id, 0 when tracking is off
+])
+DETECTION_DTYPES = {
+    1: np.dtype([('label', '<u2'), ('score', '<u2'), ('box', '<i2', 4)]),
+    2: DETECTION_DTYPE,
+}
+DEFAULT_MAX_DATAGRAM = 1400  # stays under a 1500-byte Ethernet MTU after IP/UDP headers
+
+
+class WireEncoder:
+    # Turns the sender's message dicts into datagrams: packed detections every frame, stats and
+    # metadata only every stats_interval seconds, everything split to fit max_datagram
+    def __init__(self, camera_ids=(), stats_interval=5.0, max_datagram=DEFAULT_MAX_DATAGRAM):
+        self.cameras = list(camera_ids)
+        self.labels = []
+        self._label_ids = {}
+        self.stats_interval = stats_interval
+        self.max_datagram = max_datagram
+        self._last_stats = 0.0
+        self._metadata_dirty = True
+
+    def _camera_index(self, camera_id):
+        if camera_id not in self.cameras:
+            self.cameras.append(camera_id)
+            self._metadata_dirty = True
+        return self.cameras.index(camera_id)
+
+    def _label_id(self, label):
+        label_id = self._label_ids.get(label)
+        if label_id is None:
+            label_id = self._label_ids[label] = len(self.labels)
+            self.labels.append(label)
+            self._metadata_dirty = True
+        return label_id
+
+    def pack_detections(self, detections):
+        records = np.zeros(len(detections), dtype=DETECTION_DTYPE)
+        if detections:
+            records['label'] = [self._label_id(d['label']) for d in detections]
+            scores = np.fromiter((d['score'] for d in detections), dtype=np.float32, count=len(detections))
+            records['score'] = np.clip(np.rint(scores * 65535), 0, 65535).astype(np.uint16)
+            boxes = np.asarray([d['bbox'] for d in detections], dtype=np.float32).reshape(-1, 4)
+            records['box'] = np.clip(np.rint(boxes), -32768, 32767).astype(np.int16)
+            records['track_id'] = [d.get('track_id') or 0 for d in detections]
+        return records
+
+    def _json_datagrams(self, msg_type, camera, seq, frame_seq, timestamp, payload):
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        room = self.max_datagram - HEADER.size
+        parts = [body[i:i + room] for i in range(0, len(body), room)] or [b""]
+        return [
+            HEADER.pack(WIRE_MAGIC, WIRE_VERSION, msg_type, camera, seq & 0xFFFFFFFF, frame_seq & 0xFFFFFFFF,
+                        timestamp, index, len(parts), len(part)) + part
+            for index, part in enumerate(parts)
+        ]
+
+    def encode(self, message):
+        camera = self._camera_index(message.get('camera'))
+        seq = message.get('seq', 0)
+        frame_seq = message.get('frame_seq') or 0
+        timestamp = message.get('timestamp', time.time())
+
+        records = self.pack_detections(message.get('detections', []))
+
+        # Metadata goes out ahead of the detections so a new label is never sent before its name
+        datagrams = []
+        now = time.monotonic()
+        stats = message.get('stats')
+        if self._metadata_dirty or (stats is not None and now - self._last_stats >= self.stats_interval):
+            self._last_stats = now
+            self._metadata_dirty = False
+            datagrams += self._json_datagrams(MSG_METADATA, camera, seq, frame_seq, timestamp,
+                                              {'labels': self.labels, 'cameras': self.cameras})
+            if stats is not None:
+                datagrams += self._json_datagrams(MSG_STATS, camera, seq, frame_seq, timestamp, stats)
+
+        msg_type = MSG_KEYFRAME if message.get('keyframe') else MSG_DETECTIONS
+        per_chunk = max(1, (self.max_datagram - HEADER.size) // DETECTION_DTYPE.itemsize)
+        chunks = max(1, -(-len(records) // per_chunk))
+        for index in range(chunks):
+            part = records[index * per_chunk:(index + 1) * per_chunk]
+            datagrams.append(
+                HEADER.pack(WIRE_MAGIC, WIRE_VERSION, msg_type, camera, seq & 0xFFFFFFFF,
+                            frame_seq & 0xFFFFFFFF, timestamp, index, chunks, len(part)) + part.tobytes()
+            )
+        return datagrams
+
+
+def decode_datagram(data):
+    # Reference decoder for a single datagram; returns (header dict, body) where body is a
+    # DETECTION_DTYPE array for detections or raw JSON bytes for stats/metadata chunks
+    if len(data) < HEADER.size:
+        raise ValueError("Datagram shorter than header")
+    magic, version, msg_type, camera, seq, frame_seq, timestamp, chunk, chunks, count = HEADER.unpack_from(data)
+    if magic != WIRE_MAGIC:
+        raise ValueError("Not a detection datagram")
+    if version not in DETECTION_DTYPES:
+        raise ValueError(f"Unsupported wire version {version}")
+    header = {
+        'msg_type': msg_type, 'camera': camera, 'seq': seq, 'frame_seq': frame_seq,
+        'timestamp': timestamp, 'chunk': chunk, 'chunks': chunks, 'count': count, 'version': version,
+    }
+    payload = data[HEADER.size:]
+    if msg_type in (MSG_DETECTIONS, MSG_KEYFRAME):
+        body = np.frombuffer(payload, dtype=DETECTION_DTYPES[version], count=count)
+    else:
+        body = bytes(payload[:count])
+    return header, body
+
+
+class WireDecoder:
+    # Reassembles chunked messages and resolves label / camera ids from the latest metadata
+    def __init__(self):
+        self.labels = []
+        self.cameras = []
+        self.stats = None
+        self._partial = {}
+
+    def feed(self, data):
+        # Returns a decoded detections message once all its chunks have arrived, else None
+        header, body = decode_datagram(data)
+        key = (header['msg_type'], header['camera'], header['seq'])
+        parts = self._partial.setdefault(key, {})
+        parts[header['chunk']] = body
+        if len(parts) < header['chunks']:
+            return None
+        del self._partial[key]
+        # Drop stale partial messages from this camera (lost chunks)
+        for stale in [k for k in self._partial if k[1] == header['camera'] and k[2] < header['seq']]:
+            del self._partial[stale]
+
+        ordered = [parts[i] for i in range(header['chunks'])]
+        if header['msg_type'] == MSG_METADATA:
+            metadata = json.loads(b"".join(ordered))
+            self.labels = metadata.get('labels', [])
+            self.cameras = metadata.get('cameras', [])
+            return None
+        if header['msg_type'] == MSG_STATS:
+            self.stats = json.loads(b"".join(ordered))
+            return None
+
+        records = np.concatenate(ordered) if len(ordered) > 1 else ordered[0]
+        camera = self.cameras[header['camera']] if header['camera'] < len(self.cameras) else header['camera']
+        tracked = 'track_id' in records.dtype.names
+        detections = []
+        for r in records:
+            detection = {
+                'label': self.labels[r['label']] if r['label'] < len(self.labels) else int(r['label']),
+                'score': round(float(r['score']) / 65535, 4),
+                'bbox': [int(v) for v in r['box']],
+            }
+            if tracked and r['track_id']:
+                detection['track_id'] = int(r['track_id'])
+            detections.append(detection)
+        return {
+            'camera': camera,
+            'seq': header['seq'],
+            'frame_seq': header['frame_seq'],
+            'timestamp': header['timestamp'],
+            'keyframe': header['msg_type'] == MSG_KEYFRAME,
+            'detections': detections,
+        }